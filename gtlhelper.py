@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import customtkinter
-from tkinter import messagebox
-from PIL import Image, ImageGrab, ImageEnhance
+from tkinter import messagebox, filedialog
+from PIL import Image, ImageGrab, ImageEnhance, ImageDraw, ImageFont
 
 import pytesseract
 import os
@@ -13,6 +13,29 @@ import csv
 from datetime import datetime
 import threading
 import json
+import time
+import hashlib
+import argparse
+import io
+import sqlite3
+import random
+import re
+import subprocess
+import shlex
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+try:
+    from pynput import keyboard as pynput_keyboard # Optional: global quick-capture hotkey
+except ImportError:
+    pynput_keyboard = None
+from functools import lru_cache
+import difflib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+try:
+    from multiprocessing import shared_memory # Python 3.8+; needed for the OCR process pool
+except ImportError:
+    shared_memory = None
 # Removed http.server and webbrowser as they were for Picker
 
 # --- Configuration ---
@@ -37,6 +60,106 @@ CSV_FILENAME = 'gtl_listings.csv'
 APP_SETTINGS_FILE = 'app_settings.json'
 KNOWN_INPUT_TYPES = ["GTL", "GM"]
 
+# --- OCR Profile (preprocessing + Tesseract settings; tuned by --tune, stored as "ocr_profile") ---
+DEFAULT_OCR_PROFILE = {
+    "scale": 1.5, "resample": "LANCZOS", "threshold": 128, # threshold: 0-255 or "otsu"
+    "oem": 3, "psm_line": 7, "psm_region": 6, "whitelist": None
+}
+OCR_PROFILE = dict(DEFAULT_OCR_PROFILE) # Active profile, see apply_ocr_profile()
+
+# --- OCR Model ("ocr_model" / "tessdata_dir" settings; --train-model writes a game-font model) ---
+DEFAULT_OCR_MODEL = {"lang": "eng", "tessdata_dir": None} # tessdata_dir None = Tesseract's own tessdata folder
+OCR_MODEL = dict(DEFAULT_OCR_MODEL)
+
+# --- OCR Retry Ladder Configuration ---
+# Alternative OCR configs tried in parallel when some rows fail to structure.
+# The first variant that structures every line wins; otherwise the best one is kept.
+OCR_RETRY_TIME_BUDGET_S = 3.0
+OCR_RETRY_MAX_WORKERS = 4
+OCR_LISTING_WHITELIST = "$,.'-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+OCR_RETRY_VARIANTS = [
+    {"psm": None, "threshold": 150, "scale": 2.0, "whitelist": None},
+    {"psm": None, "threshold": 100, "scale": 2.0, "whitelist": None},
+    {"psm": None, "threshold": 128, "scale": 2.5, "whitelist": OCR_LISTING_WHITELIST},
+    {"psm": 4, "threshold": 128, "scale": 1.5, "whitelist": None},
+    {"psm": 11, "threshold": 128, "scale": 2.0, "whitelist": OCR_LISTING_WHITELIST},
+] # psm None = same PSM as the normal pass (OCR_PROFILE psm_line / psm_region)
+
+# --- OCR Tuning Configuration (--tune) ---
+TUNE_SCALES = [1.0, 1.5, 2.0, 2.5]
+TUNE_RESAMPLE_FILTERS = ["LANCZOS", "BICUBIC"]
+TUNE_THRESHOLDS = [100, 128, 160, "otsu"]
+TUNE_OEMS = [1, 3]
+TUNE_WHITELISTS = [None, OCR_LISTING_WHITELIST]
+TUNE_PSM_PAIRS = [(7, 6), (7, 4), (13, 6)] # (single-line, region)
+TUNE_MAX_SAMPLES = 40
+TUNE_ACCURACY_TOLERANCE = 0.01 # Pick the fastest Pareto profile within this much of the best accuracy
+
+# --- Game-Font Model Training Configuration (--train-model) ---
+TRAIN_MODEL_NAME = 'gtl'
+TRAIN_WORK_DIR = 'model_training' # Synthetic ground truth, .lstmf files and checkpoints
+TRAIN_OUTPUT_DIR = 'tessdata' # Where <TRAIN_MODEL_NAME>.traineddata is written
+TRAIN_BASE_LANG = 'eng' # Must be a float ("best") model; tessdata_fast models cannot be fine-tuned
+TRAIN_DEFAULT_LINES = 2000
+TRAIN_HELDOUT_RATIO = 0.1 # Share of synthetic lines kept back to compare the new model with the base one
+TRAIN_DEFAULT_ITERATIONS = 3000
+TRAIN_FONT_SIZES = (11, 12, 13, 14, 16)
+TRAIN_FALLBACK_ITEM_NAMES = ("Leftovers", "Choice Band", "Rare Candy", "Master Ball", "Ability Capsule", "PP Up")
+TRAIN_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# --- Item Catalog Configuration ---
+ITEM_CATALOG_FILE = 'item_catalog.txt' # One item name per line, seeded from history and imports
+ITEM_CATALOG_USER_WORDS_FILE = 'item_catalog_user_words.txt' # Fed to Tesseract via --user-words
+ITEM_MATCH_MAX_DISTANCE_RATIO = 0.25 # Max edits allowed as a fraction of the name length...
+ITEM_MATCH_MAX_DISTANCE = 3 # ...capped, since OCR misreads only a few characters per name
+UNKNOWN_ITEM_NAME = "Unknown Item"
+
+# --- Capture Archive Configuration (opt-in via "archive_captures" setting) ---
+CAPTURE_ARCHIVE_DIR = 'capture_archive' # Content-addressed PNGs + index.json
+CAPTURE_ARCHIVE_MAX_BYTES = 256 * 1024 * 1024 # Least recently used captures are evicted above this
+CAPTURE_ARCHIVE_MAX_ENTRIES = 5000
+ARCHIVE_CORRECTIONS_CSV = 'archive_corrections.csv' # Written by --reocr-archive
+
+# --- Local OCR Server Configuration (--serve, or "ocr_server_port" setting) ---
+OCR_SERVER_HOST = '127.0.0.1' # Local only
+OCR_SERVER_DEFAULT_PORT = 8765
+OCR_SERVER_MAX_WORKERS = 2 # Concurrent OCR jobs in the shared pool
+OCR_SERVER_MAX_PENDING = 8 # Running + queued jobs before requests are rejected with 503
+OCR_SERVER_MAX_BODY_BYTES = 32 * 1024 * 1024
+SHARED_FRAME_ZERO_COPY_MODES = ("L", "RGBA", "RGBX") # Modes PIL can map straight from a buffer
+SHARED_FRAME_CHUNK_BYTES = 64 * 1024 # Pack chunk size when copying a frame into shared memory
+
+# --- Worksheet Mirror Configuration ---
+SHEET_MIRROR_DB = 'sheet_mirror.sqlite3' # Local copy of the target worksheet (Name, Price, Date columns)
+SHEET_MIRROR_BLOCK_ROWS = 500 # Rows per checksummed block; one older block is re-verified per sync
+SHEET_MIRROR_LAST_COLUMN = 'C'
+
+# --- Google Sheets Write Retries ---
+SHEETS_WRITE_ATTEMPTS = 1 # Default tries per Sheets write (opt in to retries with "sheets_write_attempts").
+                          # A 5xx can arrive after an append was applied, so retried appends may duplicate rows.
+SHEETS_READ_ATTEMPTS = 4 # Reads are safe to repeat, so quota and server errors are always retried
+SHEETS_RETRY_BASE_DELAY_S = 0.5 # Doubles after each failed attempt, plus up to 50% jitter
+SHEETS_RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# --- Offline Save Benchmark Configuration (--bench-save) ---
+BENCH_DEFAULT_SAVES = 2000
+BENCH_DEFAULT_ROWS_PER_SAVE = 5
+BENCH_DEFAULT_LATENCY_MS = 50 # Mean simulated Sheets API round trip
+BENCH_DEFAULT_QUOTA_ERROR_RATE = 0.02 # Share of fake API calls rejected with 429
+BENCH_DEFAULT_SERVER_ERROR_RATE = 0.01 # Share of fake API calls failing with 503
+BENCH_COMMIT_BEFORE_ERROR_RATE = 0.5 # Share of 503s whose write was applied anyway (lost response)
+
+# --- Worksheet Routing Configuration ("worksheet_routing" setting: None, "month" or "category") ---
+WORKSHEET_ROUTING_MODES = ("month", "category")
+ITEM_CATEGORIES_FILE = 'item_categories.json' # {"Item Name": "Category"}; used by "category" routing
+UNCATEGORIZED_SHARD = 'Other'
+SHEET_DATE_FORMAT = 'dd/mm/yyyy' # Number format applied to dates written through appendCells
+SHEET_TITLE_MAX_LEN = 100
+
+# --- UI Configuration ---
+STATUS_REDRAW_INTERVAL_MS = 16 # Status updates are coalesced to at most one label redraw per frame
+PREVIEW_GRID_VISIBLE_ROWS = 6 # Preview grid row widgets in the pool; only this many are ever created
+
 # --- Tesseract Configuration ---
 try:
     pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD_PATH
@@ -123,7 +246,18 @@ def get_gspread_client(credentials):
 def load_app_settings():
     defaults = {
         "spreadsheet_id": None, 
-        "worksheet_name": "Sheet1"
+        "worksheet_name": "Sheet1",
+        "archive_captures": False,
+        "ocr_server_port": None, # Set to a port number to serve OCR locally while the app runs
+        "ocr_process_workers": 0, # >0: server OCR runs in worker processes fed through shared memory
+        "ocr_profile": None, # Written by --tune; None = DEFAULT_OCR_PROFILE
+        "ocr_model": "eng", # Tesseract language/model; --train-model switches this to the game-font model
+        "tessdata_dir": None, # Folder holding <ocr_model>.traineddata; None = Tesseract's default tessdata
+        "mirror_worksheet": True, # Keep an incrementally synced local copy of the worksheet (sheet_mirror.sqlite3)
+        "sheets_write_attempts": 1, # >1 retries Sheets writes on 429/5xx (a retried append can duplicate rows)
+        "worksheet_routing": None, # "month"/"category": shard rows into "<worksheet_name> <YYYY-MM|category>" worksheets
+        "remembered_region": None, # [x1, y1, x2, y2] of the last region capture
+        "quick_capture_hotkey": "<ctrl>+<alt>+g" # Global hotkey (pynput syntax) to re-grab remembered_region
         # Removed picker keys
     }
     if os.path.exists(APP_SETTINGS_FILE):
@@ -137,13 +271,15 @@ def load_app_settings():
             print(f"Error loading {APP_SETTINGS_FILE}: {e}")
     return defaults
 
-def save_app_settings(spreadsheet_id, worksheet_name):
+def save_app_settings(spreadsheet_id, worksheet_name, **extra_settings):
     try:
-        settings_data = {
+        settings_data = load_app_settings() # Keep settings not passed in (e.g. archive_captures)
+        settings_data.update({
             "spreadsheet_id": spreadsheet_id,
             "worksheet_name": worksheet_name
             # Removed picker keys
-        }
+        })
+        settings_data.update(extra_settings)
         with open(APP_SETTINGS_FILE, 'w') as f:
             json.dump(settings_data, f, indent=4)
         print(f"App settings saved to {APP_SETTINGS_FILE}")
@@ -151,33 +287,93 @@ def save_app_settings(spreadsheet_id, worksheet_name):
         print(f"Error saving app settings: {e}")
 
 # --- CORE OCR AND PARSING FUNCTIONS (Unchanged - Code omitted for brevity) ---
-def preprocess_image(image_obj):
+def apply_ocr_profile(profile):
+    """Makes profile (missing keys fall back to DEFAULT_OCR_PROFILE) the active OCR_PROFILE."""
+    OCR_PROFILE.clear()
+    OCR_PROFILE.update(DEFAULT_OCR_PROFILE)
+    OCR_PROFILE.update({k: v for k, v in (profile or {}).items() if k in DEFAULT_OCR_PROFILE})
+
+def apply_ocr_model(lang=None, tessdata_dir=None):
+    """Selects the Tesseract model (language name + optional tessdata folder) used for every OCR call."""
+    OCR_MODEL.clear()
+    OCR_MODEL.update(DEFAULT_OCR_MODEL)
+    if lang:
+        OCR_MODEL["lang"] = lang
+    if tessdata_dir:
+        OCR_MODEL["tessdata_dir"] = tessdata_dir
+
+def otsu_threshold(gray_img):
+    histogram = gray_img.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_bg, weight_bg, best_var, best_t = 0, 0, -1, 128
+    for t, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * count
+        mean_bg, mean_fg = sum_bg / weight_bg, (sum_all - sum_bg) / weight_fg
+        between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between_var > best_var:
+            best_var, best_t = between_var, t + 1
+    return best_t
+
+def preprocess_image(image_obj, scale_factor=None, threshold=None, resample=None):
+    """Scales, greyscales and binarizes for OCR. Unset arguments come from the active OCR_PROFILE."""
     print("Preprocessing image...")
-    scale_factor = 1.5
+    scale_factor = scale_factor or OCR_PROFILE["scale"]
+    threshold = threshold or OCR_PROFILE["threshold"]
+    resample = resample or OCR_PROFILE["resample"]
     w, h = image_obj.size
     nw, nh = int(w * scale_factor), int(h * scale_factor)
-    img = image_obj.resize((nw, nh), Image.Resampling.LANCZOS).convert('L')
-    image_obj_binarized = img.point(lambda x: 0 if x < 128 else 255, '1')
+    img = image_obj.resize((nw, nh), getattr(Image.Resampling, resample)).convert('L')
+    if threshold == "otsu":
+        threshold = otsu_threshold(img)
+    image_obj_binarized = img.point(lambda x: 0 if x < threshold else 255, '1')
     return image_obj_binarized
 
-def perform_ocr_single_line(image_obj):
+def tesseract_user_words_config():
+    """Extra Tesseract args pointing at the item catalog word list, if one has been written."""
+    return f" --user-words {ITEM_CATALOG_USER_WORDS_FILE}" if os.path.exists(ITEM_CATALOG_USER_WORDS_FILE) else ""
+
+def build_tesseract_config(psm, oem=None, whitelist=None):
+    config = f"--oem {oem if oem is not None else OCR_PROFILE['oem']} --psm {psm}"
+    if OCR_MODEL["tessdata_dir"]:
+        config += f' --tessdata-dir "{OCR_MODEL["tessdata_dir"]}"'
+    if whitelist:
+        # pytesseract shlex-splits config (POSIX rules off Windows), so quote characters like ' must be escaped there
+        config += f" -c tessedit_char_whitelist={whitelist if os.name == 'nt' else shlex.quote(whitelist)}"
+    return config + tesseract_user_words_config()
+
+def perform_ocr_single_line(image_obj, profile=None, raise_errors=False):
     print("Performing OCR (single-line)...")
+    profile = profile or OCR_PROFILE
     try:
-        text = pytesseract.image_to_string(image_obj, config=r'--oem 3 --psm 7')
+        text = pytesseract.image_to_string(image_obj, lang=OCR_MODEL["lang"],
+                                           config=build_tesseract_config(profile["psm_line"], profile["oem"], profile["whitelist"]))
         print(f"Raw OCR (single): '{text.strip()}'")
         return text
     except Exception as e:
         print(f"OCR Error (single): {e}")
+        if raise_errors:
+            raise
         return ""
 
-def perform_ocr_for_region(image_obj):
+def perform_ocr_for_region(image_obj, profile=None, raise_errors=False):
     print("Performing OCR (region)...")
+    profile = profile or OCR_PROFILE
     try:
-        text = pytesseract.image_to_string(image_obj, config=r'--oem 3 --psm 6')
+        text = pytesseract.image_to_string(image_obj, lang=OCR_MODEL["lang"],
+                                           config=build_tesseract_config(profile["psm_region"], profile["oem"], profile["whitelist"]))
         print(f"Raw OCR (region):\n'''{text.strip()}'''")
         return text
     except Exception as e:
         print(f"OCR Error (region): {e}")
+        if raise_errors:
+            raise
         return ""
 
 def parse_raw_ocr_to_list_of_parts(ocr_text):
@@ -202,6 +398,95 @@ def parse_raw_ocr_to_list_of_parts(ocr_text):
         print("  No significant lines parsed.")
     return all_listings_parts
 
+def structure_ocr_text(ocr_text):
+    """Parses and structures OCR text. Returns (structured_rows, line_count)."""
+    list_raw_parts = parse_raw_ocr_to_list_of_parts(ocr_text) if ocr_text else []
+    struct_list = []
+    for parts in list_raw_parts:
+        item = structure_listing_data(parts)
+        if item:
+            struct_list.append(item)
+    return struct_list, len(list_raw_parts)
+
+def _ocr_retry_attempt(preproc_img, is_region_capture, variant, deadline):
+    psm = variant.get("psm") or (OCR_PROFILE["psm_region"] if is_region_capture else OCR_PROFILE["psm_line"])
+    config = build_tesseract_config(psm, whitelist=variant.get("whitelist"))
+    remaining_s = deadline - time.monotonic()
+    if remaining_s <= 0:
+        return [], 0
+    try:
+        text = pytesseract.image_to_string(preproc_img, lang=OCR_MODEL["lang"], config=config, timeout=remaining_s)
+    except Exception as e:
+        print(f"OCR Error (retry {variant}): {e}")
+        return [], 0
+    return structure_ocr_text(text)
+
+def run_ocr_retry_ladder(image_obj, is_region_capture, baseline_count=0, time_budget_s=OCR_RETRY_TIME_BUDGET_S):
+    """Re-OCRs an image with OCR_RETRY_VARIANTS in parallel within a time budget.
+    Returns the first fully structured result, else the best one that beats baseline_count, else None."""
+    print(f"Retry ladder: {len(OCR_RETRY_VARIANTS)} variants, budget {time_budget_s:.1f}s...")
+    image_obj.load() # Decode once before sharing the image across worker threads
+    deadline = time.monotonic() + time_budget_s
+    # Preprocess every variant in a pool that is joined here, so no thread still references image_obj once the
+    # ladder returns (attempts left running past the budget only hold their own preprocessed copies). This lets
+    # callers release the source buffer right away, e.g. a shared-memory frame in an OCR worker process.
+    with ThreadPoolExecutor(max_workers=OCR_RETRY_MAX_WORKERS) as preprocess_pool:
+        preproc_imgs = list(preprocess_pool.map(
+            lambda v: preprocess_image(image_obj, v.get("scale"), v.get("threshold")), OCR_RETRY_VARIANTS))
+    executor = ThreadPoolExecutor(max_workers=OCR_RETRY_MAX_WORKERS)
+    futures = {executor.submit(_ocr_retry_attempt, preproc_img, is_region_capture, v, deadline): v
+               for preproc_img, v in zip(preproc_imgs, OCR_RETRY_VARIANTS)}
+    del preproc_imgs
+    best_rows = None
+    try:
+        for fut in as_completed(futures, timeout=time_budget_s):
+            rows, line_count = fut.result()
+            if rows and len(rows) == line_count and len(rows) >= baseline_count:
+                print(f"  Retry variant won: {futures[fut]} ({len(rows)} rows, {deadline - time.monotonic():.2f}s left)")
+                return rows
+            if rows and len(rows) > max(baseline_count, len(best_rows or [])):
+                best_rows = rows
+    except FuturesTimeoutError:
+        print("  Retry ladder time budget exhausted.")
+    finally:
+        for fut in futures:
+            fut.cancel()
+        executor.shutdown(wait=False)
+    if best_rows:
+        print(f"  Retry ladder best partial result: {len(best_rows)} rows.")
+    return best_rows
+
+def ocr_image_to_listings(image_obj, is_region_capture=False, item_catalog=None, status_callback=None, row_callback=None):
+    """Full pipeline: preprocess -> OCR -> structure, with the retry ladder and catalog name correction.
+    row_callback, if given, receives each row as soon as it is structured.
+    Returns (structured_rows, error_message); error_message is None on success."""
+    report = status_callback or (lambda msg: None)
+    preproc_img = preprocess_image(image_obj)
+    ocr_text = perform_ocr_for_region(preproc_img) if is_region_capture else perform_ocr_single_line(preproc_img)
+    if not ocr_text:
+        return [], "OCR no text."
+    list_raw_parts = parse_raw_ocr_to_list_of_parts(ocr_text)
+    if not list_raw_parts:
+        return [], "No parts from OCR."
+    report(f"OCR done, {len(list_raw_parts)}L. Structuring...")
+    struct_list = []
+    for parts in list_raw_parts:
+        item = structure_listing_data(parts)
+        if item:
+            if item_catalog:
+                item_catalog.correct_rows([item])
+            struct_list.append(item)
+            if row_callback:
+                row_callback(item)
+    if len(struct_list) < len(list_raw_parts):
+        report(f"{len(list_raw_parts) - len(struct_list)} row(s) failed. Retrying OCR...")
+        retry_list = run_ocr_retry_ladder(image_obj, is_region_capture, baseline_count=len(struct_list))
+        if retry_list:
+            struct_list = item_catalog.correct_rows(retry_list) if item_catalog else retry_list
+    if not struct_list:
+        return [], "Structure fail. Check OCR/selection."
+    return struct_list, None
+
 MONTH_MAP = {'Jan':1,'Feb':2,'Mar':3,'Apr':4,'May':5,'Jun':6,'Jul':7,'Aug':8,'Sep':9,'Oct':10,'Nov':11,'Dec':12}
 def structure_listing_data(raw_parts):
     if not raw_parts or len(raw_parts) < 4:
@@ -231,7 +516,7 @@ def structure_listing_data(raw_parts):
     name_coll = raw_parts[1:len(raw_parts) - 3]
     if name_coll and name_coll[-1].upper() in KNOWN_INPUT_TYPES:
         name_coll = name_coll[:-1]
-    name = " ".join(name_coll).strip() if name_coll else "Unknown Item"
+    name = " ".join(name_coll).strip() if name_coll else UNKNOWN_ITEM_NAME
 
     try:
         price = float(price_str.replace('$', '').replace(',', ''))
@@ -240,6 +525,952 @@ def structure_listing_data(raw_parts):
         return None
     return [name, price, formatted_date]
 
+# --- Item Catalog (fuzzy name correction) ---
+def levenshtein_distance(a, b, max_dist=None):
+    """Edit distance between a and b. With max_dist, stops early and returns max_dist + 1 once exceeded."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_dist is not None and len(a) - len(b) > max_dist:
+        return max_dist + 1
+    if not b:
+        return len(a)
+    prev_row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur_row = [i]
+        for j, cb in enumerate(b, 1):
+            cur_row.append(min(prev_row[j] + 1, cur_row[j - 1] + 1, prev_row[j - 1] + (ca != cb)))
+        if max_dist is not None and min(cur_row) > max_dist:
+            return max_dist + 1
+        prev_row = cur_row
+    return prev_row[-1]
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Inverted trigram index over lowercased names for fast approximate lookup.
+    Candidates must share enough trigrams to be within max_dist edits; only those are scored."""
+    def __init__(self):
+        self.words = []
+        self.word_grams = []
+        self.postings = {} # trigram -> list of word ids
+        self.ids_by_length = {} # word length -> list of word ids (for queries too short to filter by trigram)
+
+    def add(self, word):
+        grams = _trigrams(word)
+        word_id = len(self.words)
+        self.words.append(word)
+        self.word_grams.append(grams)
+        for g in grams:
+            self.postings.setdefault(g, []).append(word_id)
+        self.ids_by_length.setdefault(len(word), []).append(word_id)
+
+    def search(self, word, max_dist):
+        """Returns (distance, word) of the closest entry within max_dist, or None."""
+        grams = _trigrams(word)
+        # Each edit destroys at most 3 trigrams, so a match shares all but 3 * max_dist of ours
+        # and must appear in at least one of our 3 * max_dist + 1 rarest trigrams (prefix filter).
+        if len(grams) <= 3 * max_dist:
+            # Short query (1-2 chars): a match may share no trigram at all, so scan entries of similar length
+            candidate_ids = {word_id for length in range(max(0, len(word) - max_dist), len(word) + max_dist + 1)
+                             for word_id in self.ids_by_length.get(length, ())}
+        else:
+            rarest = sorted(grams, key=lambda g: len(self.postings.get(g, ())))[:3 * max_dist + 1]
+            candidate_ids = {word_id for g in rarest for word_id in self.postings.get(g, ())}
+        candidates = []
+        for word_id in candidate_ids:
+            if abs(len(self.words[word_id]) - len(word)) > max_dist:
+                continue
+            other_grams = self.word_grams[word_id]
+            count = len(grams & other_grams)
+            if count >= max(len(grams), len(other_grams)) - 3 * max_dist:
+                candidates.append((count, word_id))
+        candidates.sort(reverse=True)
+        best = None
+        for _, word_id in candidates:
+            dist = levenshtein_distance(word, self.words[word_id], max_dist)
+            if dist <= max_dist:
+                best = (dist, self.words[word_id])
+                max_dist = dist - 1 # Only a strictly closer entry can replace the current best
+                if max_dist < 0:
+                    break
+        return best
+
+class ItemCatalog:
+    """Known item names, used to snap OCR'd names onto their canonical spelling."""
+    def __init__(self, catalog_path=ITEM_CATALOG_FILE, history_csv_path=CSV_FILENAME):
+        self.catalog_path = catalog_path
+        self.names = {} # lowercased -> canonical spelling
+        self.index = TrigramIndex()
+        self._closest_cached = lru_cache(maxsize=4096)(self._closest)
+        self._load_file(catalog_path)
+        added_from_history = self._load_file(history_csv_path, csv_first_column=True)
+        if added_from_history:
+            self.save()
+        print(f"Item catalog: {len(self.names)} names loaded.")
+
+    def _load_file(self, path, csv_first_column=False):
+        if not path or not os.path.exists(path):
+            return 0
+        added = 0
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                lines = (row[0] for row in csv.reader(f) if row) if csv_first_column else f
+                for line in lines:
+                    if self.add(line, persist=False):
+                        added += 1
+        except Exception as e:
+            print(f"Item catalog load error ({path}): {e}")
+        return added
+
+    def add(self, name, persist=True):
+        name = str(name).strip()
+        key = name.lower()
+        if not name or name == UNKNOWN_ITEM_NAME or key in self.names:
+            return False
+        self.names[key] = name
+        self.index.add(key)
+        self._closest_cached.cache_clear()
+        if persist:
+            self.save()
+        return True
+
+    def import_list(self, path):
+        """Imports names from a .txt (one per line) or .csv (first column) file. Returns count added."""
+        added = self._load_file(path, csv_first_column=path.lower().endswith('.csv'))
+        if added:
+            self.save()
+        print(f"Item catalog: imported {added} new name(s) from {path}.")
+        return added
+
+    def save(self):
+        try:
+            ordered = sorted(self.names.values(), key=str.lower)
+            with open(self.catalog_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(ordered) + "\n")
+            # Tesseract user-words are matched per word, not per full name
+            words = sorted({w for n in ordered for w in n.split() if len(w) > 1})
+            with open(ITEM_CATALOG_USER_WORDS_FILE, 'w', encoding='utf-8') as f:
+                f.write("\n".join(words) + "\n")
+        except Exception as e:
+            print(f"Item catalog save error: {e}")
+
+    def _closest(self, key):
+        exact = self.names.get(key)
+        if exact:
+            return exact
+        max_dist = min(ITEM_MATCH_MAX_DISTANCE, max(1, int(len(key) * ITEM_MATCH_MAX_DISTANCE_RATIO)))
+        found = self.index.search(key, max_dist)
+        return self.names[found[1]] if found else None
+
+    def correct_name(self, name):
+        if not name or name == UNKNOWN_ITEM_NAME or not self.names:
+            return name
+        match = self._closest_cached(name.strip().lower())
+        if match and match != name:
+            print(f"  Catalog: '{name}' -> '{match}'")
+        return match or name
+
+    def correct_rows(self, rows):
+        for row in rows or []:
+            row[0] = self.correct_name(row[0])
+        return rows
+
+# --- Capture Archive (opt-in) and bulk re-OCR ---
+class CaptureArchive:
+    """Content-addressed store of raw captures, linked to the rows saved from them.
+    Images are lossless PNGs named by the SHA-256 of their pixels; size is bounded by LRU eviction."""
+    def __init__(self, archive_dir=CAPTURE_ARCHIVE_DIR, max_bytes=CAPTURE_ARCHIVE_MAX_BYTES, max_entries=CAPTURE_ARCHIVE_MAX_ENTRIES):
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, 'index.json')
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.index = {} # digest -> {"file", "bytes", "region", "created", "last_used", "rows"}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except Exception as e:
+                print(f"Capture archive index load error: {e}")
+
+    def _write_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def image_path(self, digest):
+        return os.path.join(self.archive_dir, self.index[digest]["file"])
+
+    def store(self, image_obj, is_region_capture=False):
+        """Archives a capture and returns its digest (None on failure). Duplicate captures are stored once."""
+        try:
+            digest = hashlib.sha256(f"{image_obj.mode}{image_obj.size}".encode() + image_obj.tobytes()).hexdigest()
+            with self.lock:
+                entry = self.index.get(digest)
+                if entry is None:
+                    rel_path = os.path.join(digest[:2], digest + '.png')
+                    full_path = os.path.join(self.archive_dir, rel_path)
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    image_obj.save(full_path, format='PNG')
+                    entry = self.index[digest] = {
+                        "file": rel_path, "bytes": os.path.getsize(full_path), "region": is_region_capture,
+                        "created": datetime.now().isoformat(timespec='seconds'), "rows": []}
+                entry["last_used"] = time.time()
+                self._evict_locked(keep_digest=digest)
+                self._write_index()
+            return digest
+        except Exception as e:
+            print(f"Capture archive store error: {e}")
+            return None
+
+    def link_rows(self, digest, rows):
+        if not digest:
+            return
+        with self.lock:
+            entry = self.index.get(digest)
+            if entry is None:
+                return
+            entry["rows"] = [list(r) for r in rows]
+            entry["last_used"] = time.time()
+            try:
+                self._write_index()
+            except Exception as e:
+                print(f"Capture archive index write error: {e}")
+
+    def _evict_locked(self, keep_digest=None):
+        total_bytes = sum(e["bytes"] for e in self.index.values())
+        if total_bytes <= self.max_bytes and len(self.index) <= self.max_entries:
+            return
+        for digest in sorted(self.index, key=lambda d: self.index[d].get("last_used", 0)):
+            if total_bytes <= self.max_bytes and len(self.index) <= self.max_entries:
+                break
+            if digest == keep_digest:
+                continue
+            entry = self.index.pop(digest)
+            total_bytes -= entry["bytes"]
+            try:
+                os.remove(os.path.join(self.archive_dir, entry["file"]))
+            except OSError as e:
+                print(f"Capture archive evict error: {e}")
+        print(f"Capture archive: {len(self.index)} captures, {total_bytes / 1024 / 1024:.1f} MB after eviction.")
+
+def _reocr_archived_capture(archive, digest, item_catalog):
+    entry = archive.index[digest]
+    with Image.open(archive.image_path(digest)) as img:
+        img.load()
+        new_rows, _ = ocr_image_to_listings(img, entry.get("region", False), item_catalog)
+    return [list(r) for r in new_rows]
+
+def diff_saved_rows(old_rows, new_rows):
+    """Aligns saved rows with re-OCR'd rows by content and returns (saved_row_index, old, new) differences.
+    A missing or extra row therefore doesn't shift every later row into a false difference. New rows that were
+    never saved are not reported: rows excluded in the preview grid are unsaved too."""
+    differences = []
+    matcher = difflib.SequenceMatcher(None, [tuple(r) for r in old_rows], [tuple(r) for r in new_rows], autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag in ("equal", "insert"):
+            continue
+        for offset, row_num in enumerate(range(old_start, old_end)):
+            new = list(new_rows[new_start + offset]) if new_start + offset < new_end else None
+            differences.append((row_num, list(old_rows[row_num]), new))
+    return differences
+
+def reocr_capture_archive(archive, item_catalog=None, max_workers=4, corrections_csv=ARCHIVE_CORRECTIONS_CSV):
+    """Replays archived captures that have saved rows through the current OCR pipeline on a worker pool.
+    Saved rows that now parse differently (or are no longer found) are written to corrections_csv.
+    Returns the list of (digest, saved_row_index, old, new) differences."""
+    digests = [d for d, e in archive.index.items() if e.get("rows")]
+    print(f"Re-OCR: {len(digests)} archived capture(s) with saved rows, {max_workers} worker(s)...")
+    differences = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_reocr_archived_capture, archive, d, item_catalog): d for d in digests}
+        for fut in as_completed(futures):
+            digest = futures[fut]
+            try:
+                new_rows = fut.result()
+            except Exception as e:
+                print(f"  Re-OCR error for {digest[:12]}: {e}")
+                continue
+            differences.extend((digest, row_num, old, new)
+                               for row_num, old, new in diff_saved_rows(archive.index[digest]["rows"], new_rows))
+    print(f"Re-OCR: {len(differences)} row difference(s) found.")
+    if differences and corrections_csv:
+        try:
+            with open(corrections_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(["Capture", "Row", "Saved Name", "Saved Price", "Saved Date", "New Name", "New Price", "New Date"])
+                for digest, row_num, old, new in differences:
+                    writer.writerow([digest, row_num] + (old or ["", "", ""]) + (new or ["", "", ""]))
+            print(f"Re-OCR: corrections written to {corrections_csv}")
+        except Exception as e:
+            print(f"Re-OCR corrections write error: {e}")
+    return differences
+
+# --- OCR Auto-Tuning (--tune) ---
+def load_tuning_samples(labels_dir=None, max_samples=TUNE_MAX_SAMPLES):
+    """Loads a labelled set as (image, is_region_capture, expected_rows) tuples.
+    labels_dir/labels.json maps image file name -> {"region": bool, "rows": [[name, price, "dd/mm/yyyy"], ...]}.
+    Without labels_dir, archived captures with saved rows are used as the labelled set."""
+    entries = []
+    if labels_dir:
+        try:
+            with open(os.path.join(labels_dir, 'labels.json'), 'r', encoding='utf-8') as f:
+                labels = json.load(f)
+        except Exception as e:
+            print(f"Tuning labels load error: {e}")
+            return []
+        entries = [(os.path.join(labels_dir, fn), lbl.get("region", True), lbl.get("rows", [])) for fn, lbl in labels.items()]
+    else:
+        archive = CaptureArchive()
+        entries = [(archive.image_path(d), e.get("region", False), e["rows"]) for d, e in archive.index.items() if e.get("rows")]
+
+    samples = []
+    for path, is_region_capture, rows in entries[:max_samples]:
+        try:
+            with Image.open(path) as img:
+                img.load()
+                samples.append((img.copy(), is_region_capture, [[r[0], float(r[1]), r[2]] for r in rows]))
+        except Exception as e:
+            print(f"Tuning sample load error ({path}): {e}")
+    print(f"Tuning: {len(samples)} labelled sample(s) loaded.")
+    return samples
+
+def evaluate_ocr_profile(profile, samples, item_catalog=None):
+    """Runs one OCR pass per sample with profile. Returns (accuracy 0-1, mean latency in seconds).
+    Tesseract errors propagate, so a profile that cannot run is never scored as 0% accuracy."""
+    scores, latencies = [], []
+    for image_obj, is_region_capture, expected_rows in samples:
+        start = time.perf_counter()
+        preproc_img = preprocess_image(image_obj, profile["scale"], profile["threshold"], profile["resample"])
+        if is_region_capture:
+            ocr_text = perform_ocr_for_region(preproc_img, profile, raise_errors=True)
+        else:
+            ocr_text = perform_ocr_single_line(preproc_img, profile, raise_errors=True)
+        rows, _ = structure_ocr_text(ocr_text)
+        latencies.append(time.perf_counter() - start)
+        if item_catalog:
+            item_catalog.correct_rows(rows)
+        unmatched = [list(r) for r in expected_rows]
+        matched = 0
+        for row in rows:
+            if row in unmatched:
+                unmatched.remove(row)
+                matched += 1
+        # Missing rows and spurious extra rows both cost accuracy
+        scores.append(matched / max(len(expected_rows), len(rows), 1))
+    return sum(scores) / len(scores), sum(latencies) / len(latencies)
+
+def tune_ocr_profile(samples, item_catalog=None, max_workers=4):
+    """Sweeps the TUNE_* grid over samples. Returns (chosen_profile, pareto_front), where pareto_front is a
+    list of (accuracy, latency_s, profile) sorted by latency, and chosen_profile is the fastest front
+    entry within TUNE_ACCURACY_TOLERANCE of the best accuracy."""
+    grid = [{"scale": scale, "resample": resample, "threshold": threshold, "oem": oem,
+             "psm_line": psm_line, "psm_region": psm_region, "whitelist": whitelist}
+            for scale in TUNE_SCALES for resample in TUNE_RESAMPLE_FILTERS for threshold in TUNE_THRESHOLDS
+            for oem in TUNE_OEMS for psm_line, psm_region in TUNE_PSM_PAIRS for whitelist in TUNE_WHITELISTS]
+    print(f"Tuning: {len(grid)} configurations x {len(samples)} samples, {max_workers} worker(s)...")
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(evaluate_ocr_profile, profile, samples, item_catalog): profile for profile in grid}
+        for fut in as_completed(futures):
+            try:
+                accuracy, latency = fut.result()
+            except Exception as e:
+                print(f"  Tuning: skipping {futures[fut]}, OCR failed: {e}")
+                continue
+            results.append((accuracy, latency, futures[fut]))
+    if not results:
+        return None, []
+
+    pareto_front = []
+    for accuracy, latency, profile in sorted(results, key=lambda r: (r[1], -r[0])):
+        if not pareto_front or accuracy > pareto_front[-1][0]:
+            pareto_front.append((accuracy, latency, profile))
+    best_accuracy = max(r[0] for r in pareto_front)
+    chosen = next(r for r in pareto_front if r[0] >= best_accuracy - TUNE_ACCURACY_TOLERANCE)
+    print("Tuning Pareto front (accuracy, ms/sample, profile):")
+    for accuracy, latency, profile in pareto_front:
+        marker = "*" if profile is chosen[2] else " "
+        print(f" {marker} {accuracy:6.1%} {latency * 1000:7.0f}ms  {profile}")
+    return chosen[2], pareto_front
+
+def run_ocr_tuning(labels_dir=None, max_workers=4):
+    samples = load_tuning_samples(labels_dir)
+    if not samples:
+        print("Tuning: no labelled samples. Enable the capture archive and save some listings, or pass --labels DIR.")
+        return None
+    profile, _ = tune_ocr_profile(samples, ItemCatalog(), max_workers)
+    if profile:
+        settings = load_app_settings()
+        save_app_settings(settings["spreadsheet_id"], settings["worksheet_name"], ocr_profile=profile)
+        print(f"Tuning: saved OCR profile to {APP_SETTINGS_FILE}: {profile}")
+    return profile
+
+# --- Game-Font Model Training (--train-model) ---
+def synth_gtl_line(rng, item_names):
+    """One synthetic GTL row as the game prints it, e.g. '$12,500 Leftovers GTL Oct 5, 2025'."""
+    price = int(10 ** rng.uniform(1, 7))
+    day = datetime(rng.randint(2020, 2027), rng.randint(1, 12), rng.randint(1, 28))
+    return (f"${price:,} {rng.choice(item_names)} {rng.choice(KNOWN_INPUT_TYPES)} "
+            f"{TRAIN_MONTH_NAMES[day.month - 1]} {day.day}, {day.year}")
+
+def render_gtl_line(text, font, rng):
+    """Renders light text on a dark panel, like a screenshot of the GTL window."""
+    left, top, right, bottom = font.getbbox(text)
+    pad_x, pad_y = rng.randint(2, 8), rng.randint(2, 6)
+    background = tuple(rng.randint(20, 70) for _ in range(3))
+    foreground = tuple(rng.randint(200, 255) for _ in range(3))
+    img = Image.new("RGB", (right - left + 2 * pad_x, bottom - top + 2 * pad_y), background)
+    ImageDraw.Draw(img).text((pad_x - left, pad_y - top), text, font=font, fill=foreground)
+    return img
+
+def write_line_box_file(path, text, width, height):
+    """Writes a tesstrain-style WordStr box file covering the whole line image."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"WordStr 0 0 {width} {height} 0 #{text}\n")
+        f.write(f"\t {width} {height} {width + 1} {height + 1} 0\n")
+
+def generate_training_lines(font_path, work_dir=TRAIN_WORK_DIR, line_count=TRAIN_DEFAULT_LINES, item_names=None, seed=0):
+    """Renders synthetic GTL rows in the game font. Training lines are stored already preprocessed
+    (what Tesseract sees at runtime) with .gt.txt/.box files; held-out lines are stored raw with a
+    labels.json in the --labels format so they can be scored with evaluate_ocr_profile.
+    Returns (list of training image paths, held-out dir)."""
+    rng = random.Random(seed)
+    item_names = list(item_names or TRAIN_FALLBACK_ITEM_NAMES)
+    fonts = [ImageFont.truetype(font_path, size) for size in TRAIN_FONT_SIZES]
+    train_dir, heldout_dir = os.path.join(work_dir, "ground_truth"), os.path.join(work_dir, "heldout")
+    os.makedirs(train_dir, exist_ok=True)
+    os.makedirs(heldout_dir, exist_ok=True)
+    train_images, heldout_labels = [], {}
+    heldout_count = max(1, int(line_count * TRAIN_HELDOUT_RATIO))
+    for i in range(line_count):
+        text = synth_gtl_line(rng, item_names)
+        img = render_gtl_line(text, rng.choice(fonts), rng)
+        if i < heldout_count:
+            file_name = f"line_{i:05d}.png"
+            img.save(os.path.join(heldout_dir, file_name))
+            heldout_labels[file_name] = {"region": False, "rows": [structure_listing_data(text.split())]}
+            continue
+        base = os.path.join(train_dir, f"line_{i:05d}")
+        preproc_img = preprocess_image(img).convert('L')
+        preproc_img.save(base + ".png")
+        with open(base + ".gt.txt", 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        write_line_box_file(base + ".box", text, *preproc_img.size)
+        train_images.append(base + ".png")
+    with open(os.path.join(heldout_dir, 'labels.json'), 'w', encoding='utf-8') as f:
+        json.dump(heldout_labels, f, indent=2)
+    print(f"Training: rendered {len(train_images)} training and {heldout_count} held-out line(s) in {work_dir}.")
+    return train_images, heldout_dir
+
+def _training_tool(name):
+    """Path of a Tesseract training tool, looked up next to the configured tesseract executable."""
+    tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+    tool_dir = os.path.dirname(tesseract_cmd)
+    if not tool_dir:
+        return name
+    return os.path.join(tool_dir, name + (".exe" if tesseract_cmd.lower().endswith(".exe") else ""))
+
+def _run_training_step(args):
+    print("Training: " + " ".join(args))
+    subprocess.run(args, check=True)
+
+def find_base_traineddata(lang=TRAIN_BASE_LANG):
+    """Locates <lang>.traineddata in TESSDATA_PREFIX or the folder reported by 'tesseract --list-langs'."""
+    candidates = [os.environ.get("TESSDATA_PREFIX")]
+    try:
+        result = subprocess.run([pytesseract.pytesseract.tesseract_cmd, "--list-langs"], capture_output=True, text=True)
+        found = re.search(r'languages in "([^"]+)"', result.stdout + result.stderr)
+        if found:
+            candidates.append(found.group(1))
+    except OSError as e:
+        print(f"Training: could not run tesseract ({e}).")
+    for tessdata_dir in filter(None, candidates):
+        path = os.path.join(tessdata_dir, f"{lang}.traineddata")
+        if os.path.exists(path):
+            return path
+    return None
+
+def train_game_font_model(font_path, base_traineddata=None, line_count=TRAIN_DEFAULT_LINES,
+                          max_iterations=TRAIN_DEFAULT_ITERATIONS, work_dir=TRAIN_WORK_DIR, output_dir=TRAIN_OUTPUT_DIR):
+    """Fine-tunes the base LSTM model on synthetic GTL rows rendered in the game font, on CPU, and writes an
+    integer-quantized, LSTM-only <TRAIN_MODEL_NAME>.traineddata to output_dir. The new model is kept (and
+    selected in app_settings.json) only if it parses the held-out lines at least as well as the base model."""
+    base_traineddata = base_traineddata or find_base_traineddata()
+    if not base_traineddata or not os.path.exists(base_traineddata):
+        print(f"Training: base model not found. Pass --base-traineddata PATH to a float '{TRAIN_BASE_LANG}.traineddata' (tessdata_best).")
+        return None
+    train_images, heldout_dir = generate_training_lines(font_path, work_dir, line_count, ItemCatalog().names.values() or None)
+    try:
+        lstmf_paths = []
+        for image_path in train_images:
+            base = os.path.splitext(image_path)[0]
+            if not os.path.exists(base + ".lstmf"):
+                _run_training_step([pytesseract.pytesseract.tesseract_cmd, image_path, base, "--psm", "7", "lstm.train"])
+            lstmf_paths.append(base + ".lstmf")
+        list_file = os.path.join(work_dir, "train_list.txt")
+        with open(list_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lstmf_paths) + "\n")
+
+        base_lstm = os.path.join(work_dir, f"{TRAIN_BASE_LANG}.lstm")
+        _run_training_step([_training_tool("combine_tessdata"), "-e", base_traineddata, base_lstm])
+        checkpoint_prefix = os.path.join(work_dir, TRAIN_MODEL_NAME)
+        _run_training_step([_training_tool("lstmtraining"), "--continue_from", base_lstm, "--traineddata", base_traineddata,
+                            "--model_output", checkpoint_prefix, "--train_listfile", list_file,
+                            "--max_iterations", str(max_iterations)])
+        os.makedirs(output_dir, exist_ok=True)
+        model_path = os.path.join(output_dir, f"{TRAIN_MODEL_NAME}.traineddata")
+        _run_training_step([_training_tool("lstmtraining"), "--stop_training", "--convert_to_int",
+                            "--continue_from", checkpoint_prefix + "_checkpoint", "--traineddata", base_traineddata,
+                            "--model_output", model_path])
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Training failed: {e}")
+        return None
+
+    samples = load_tuning_samples(heldout_dir)
+    previous_model = dict(OCR_MODEL)
+    try:
+        apply_ocr_model(TRAIN_BASE_LANG, os.path.dirname(os.path.abspath(base_traineddata)))
+        base_accuracy, base_latency = evaluate_ocr_profile(OCR_PROFILE, samples)
+        apply_ocr_model(TRAIN_MODEL_NAME, os.path.abspath(output_dir))
+        new_accuracy, new_latency = evaluate_ocr_profile(OCR_PROFILE, samples)
+    except Exception as e:
+        print(f"Training: could not compare models on held-out lines: {e}")
+        return None
+    finally:
+        apply_ocr_model(previous_model["lang"], previous_model["tessdata_dir"])
+    print(f"Training: base '{TRAIN_BASE_LANG}' {base_accuracy:.1%} at {base_latency * 1000:.0f}ms/line "
+          f"({os.path.getsize(base_traineddata) / 1e6:.1f} MB); '{TRAIN_MODEL_NAME}' {new_accuracy:.1%} at "
+          f"{new_latency * 1000:.0f}ms/line ({os.path.getsize(model_path) / 1e6:.1f} MB).")
+    if new_accuracy < base_accuracy:
+        print(f"Training: new model is less accurate; keeping '{previous_model['lang']}'. Try more --lines or --iterations.")
+        return None
+    settings = load_app_settings()
+    save_app_settings(settings["spreadsheet_id"], settings["worksheet_name"],
+                      ocr_model=TRAIN_MODEL_NAME, tessdata_dir=os.path.abspath(output_dir))
+    print(f"Training: saved {model_path} and selected it in {APP_SETTINGS_FILE}.")
+    return model_path
+
+# --- Shared-Memory Frame Transport (OCR process pool) ---
+class SharedFrame:
+    """A captured frame packed into shared memory in a single pass. Worker processes attach by handle and read
+    the pixels in place, so no image is pickled across the process boundary. The creator owns the block
+    and must call release() once every reader is done."""
+    def __init__(self, image_obj):
+        image_obj.load()
+        if image_obj.mode in SHARED_FRAME_ZERO_COPY_MODES:
+            self.mode = image_obj.mode
+        elif image_obj.mode == "RGB":
+            self.mode = "RGBX" # PIL already stores RGB as 4 bytes/pixel, so packing to RGBX is a straight copy
+        else:
+            image_obj = image_obj.convert("RGBA") # Rare capture modes (P, LA, ...) still need a convert
+            self.mode = "RGBA"
+        self.size = image_obj.size
+        frame_bytes = self.size[0] * self.size[1] * Image.getmodebands(self.mode)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(frame_bytes, 1))
+        # Pack straight into the block in small chunks rather than building a full-size bytes copy first
+        encoder = Image._getencoder(image_obj.mode, "raw", (self.mode, 0, 1))
+        encoder.setimage(image_obj.im, (0, 0) + self.size)
+        chunk_size = max(SHARED_FRAME_CHUNK_BYTES, self.size[0] * 4)
+        offset = 0
+        while frame_bytes:
+            _, status, chunk = encoder.encode(chunk_size)
+            self.shm.buf[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+            if status:
+                break
+        if frame_bytes and (status < 0 or offset != frame_bytes):
+            self.release()
+            raise RuntimeError(f"SharedFrame pack error {status} ({offset}/{frame_bytes} bytes)")
+
+    @property
+    def handle(self):
+        """Small picklable reference: (shared memory name, mode, size)."""
+        return (self.shm.name, self.mode, self.size)
+
+    def release(self):
+        if self.shm is None:
+            return
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception as e:
+            print(f"SharedFrame release error: {e}")
+        self.shm = None
+
+def _attach_shared_frame(handle):
+    """Maps a SharedFrame handle to (image, shm) without copying pixels. Drop the image before shm.close()."""
+    name, mode, size = handle
+    shm = shared_memory.SharedMemory(name=name)
+    return Image.frombuffer(mode, size, shm.buf, "raw", mode, 0, 1), shm
+
+_process_item_catalog = None
+
+def _init_ocr_process_worker(ocr_profile, ocr_model):
+    global _process_item_catalog
+    apply_ocr_profile(ocr_profile) # Spawned workers start from a fresh import
+    apply_ocr_model(ocr_model["lang"], ocr_model["tessdata_dir"])
+    _process_item_catalog = ItemCatalog()
+
+def _ocr_shared_frame_worker(handle, is_region_capture):
+    image_obj, shm = _attach_shared_frame(handle)
+    try:
+        return ocr_image_to_listings(image_obj, is_region_capture, _process_item_catalog)
+    finally:
+        del image_obj
+        shm.close() # The retry ladder is done with the frame by the time ocr_image_to_listings returns
+
+class SharedMemoryOcrPool:
+    """Process pool running ocr_image_to_listings on frames handed over through SharedFrame."""
+    def __init__(self, max_workers):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_ocr_process_worker, initargs=(dict(OCR_PROFILE), dict(OCR_MODEL)))
+
+    def submit(self, image_obj, is_region_capture=True):
+        frame = SharedFrame(image_obj)
+        try:
+            fut = self.executor.submit(_ocr_shared_frame_worker, frame.handle, is_region_capture)
+        except Exception:
+            frame.release()
+            raise
+        fut.add_done_callback(lambda _: frame.release())
+        return fut
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+# --- Local OCR Server ---
+class OcrService:
+    """Shared warm OCR worker pool with bounded concurrency. submit() returns None when saturated.
+    With process_workers > 0, OCR runs in a SharedMemoryOcrPool instead of threads."""
+    def __init__(self, item_catalog=None, max_workers=OCR_SERVER_MAX_WORKERS, max_pending=OCR_SERVER_MAX_PENDING, process_workers=0):
+        self.item_catalog = item_catalog
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.process_pool = None
+        if process_workers > 0:
+            if shared_memory is None:
+                print("multiprocessing.shared_memory unavailable (Python 3.8+ needed); using OCR threads.")
+            else:
+                self.process_pool = SharedMemoryOcrPool(process_workers)
+        self.executor = None if self.process_pool else ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, image_obj, is_region_capture=True):
+        if not self.slots.acquire(blocking=False):
+            return None
+        try:
+            if self.process_pool:
+                fut = self.process_pool.submit(image_obj, is_region_capture)
+            else:
+                fut = self.executor.submit(ocr_image_to_listings, image_obj, is_region_capture, self.item_catalog)
+        except Exception:
+            self.slots.release()
+            raise
+        fut.add_done_callback(lambda _: self.slots.release())
+        return fut
+
+    def shutdown(self):
+        if self.process_pool:
+            self.process_pool.shutdown()
+        else:
+            self.executor.shutdown(wait=False)
+
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    """POST /ocr with raw image bytes, or JSON {"path": ..., "region": bool}. ?mode=line for single-line OCR.
+    Responds with {"rows": [{"name", "price", "date"}], "error": str|null}. GET /health for a liveness check."""
+    server_version = "GTLHelperOCR/1.0"
+
+    def log_message(self, format, *args):
+        print(f"OCR server: {self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/ocr":
+            self._send_json(404, {"error": "Not found."})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > OCR_SERVER_MAX_BODY_BYTES:
+            self._send_json(413 if length > 0 else 400, {"error": "Missing or oversized body."})
+            return
+        body = self.rfile.read(length)
+        is_region_capture = parse_qs(url.query).get("mode", ["region"])[0] != "line"
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body)
+                is_region_capture = bool(request.get("region", is_region_capture))
+                image_obj = Image.open(request["path"])
+            else:
+                image_obj = Image.open(io.BytesIO(body))
+            image_obj.load()
+        except Exception as e:
+            self._send_json(400, {"error": f"Bad image: {e}"})
+            return
+
+        fut = self.server.ocr_service.submit(image_obj, is_region_capture)
+        if fut is None:
+            self._send_json(503, {"error": "OCR queue full, retry later."}, {"Retry-After": "1"})
+            return
+        try:
+            rows, error_msg = fut.result()
+        except Exception as e:
+            self._send_json(500, {"error": f"OCR failed: {e}"})
+            return
+        self._send_json(200, {
+            "rows": [{"name": name, "price": price, "date": date} for name, price, date in rows],
+            "error": error_msg})
+
+def start_ocr_server(ocr_service, port=OCR_SERVER_DEFAULT_PORT, host=OCR_SERVER_HOST):
+    """Starts the local OCR HTTP server on a daemon thread. Returns the server (call shutdown() to stop) or None."""
+    try:
+        server = ThreadingHTTPServer((host, port), OcrRequestHandler)
+    except OSError as e:
+        print(f"OCR server failed to start on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    server.ocr_service = ocr_service
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"OCR server listening on http://{host}:{port}/ocr")
+    return server
+
+# --- Worksheet Routing (per-month / per-category shards) ---
+def load_item_categories(path=ITEM_CATEGORIES_FILE):
+    """Loads the item -> category map used by "category" routing (lookup is case-insensitive)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {str(k).casefold(): str(v) for k, v in json.load(f).items()}
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return {}
+
+def shard_title_for_row(row, mode, base_title, item_categories=None):
+    """Worksheet title a [name, price, 'dd/mm/yyyy'] row routes to."""
+    if mode == "month":
+        suffix = datetime.strptime(row[2], '%d/%m/%Y').strftime('%Y-%m')
+    else:
+        suffix = (item_categories or {}).get(str(row[0]).casefold(), UNCATEGORIZED_SHARD)
+    return f"{base_title} {suffix}"[:SHEET_TITLE_MAX_LEN]
+
+def route_rows_to_shards(rows, mode, base_title, item_categories=None):
+    """Groups rows by target worksheet title, keeping row order within each shard."""
+    shards = {}
+    for row in rows:
+        shards.setdefault(shard_title_for_row(row, mode, base_title, item_categories), []).append(row)
+    return shards
+
+def fetch_sheet_ids(spreadsheet):
+    """Returns {worksheet title: sheetId} for every worksheet in the spreadsheet (one metadata read)."""
+    metadata = spreadsheet.fetch_sheet_metadata(params={"fields": "sheets.properties(sheetId,title)"})
+    return {s["properties"]["title"]: s["properties"]["sheetId"] for s in metadata.get("sheets", [])}
+
+def _sheet_cell(value, is_date=False):
+    if is_date:
+        day_serial = (datetime.strptime(value, '%d/%m/%Y') - datetime(1899, 12, 30)).days # Sheets date serial
+        return {"userEnteredValue": {"numberValue": day_serial},
+                "userEnteredFormat": {"numberFormat": {"type": "DATE", "pattern": SHEET_DATE_FORMAT}}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+def build_sharded_append_requests(rows_by_title, sheet_ids):
+    """batchUpdate requests that create missing shard worksheets and append every shard's rows.
+    New sheetIds are picked client-side so appendCells can target them in the same request.
+    Adds the worksheets being created to sheet_ids, so pass a copy of any shared cache."""
+    add_requests, append_requests = [], []
+    used_ids = set(sheet_ids.values())
+    for title, rows in rows_by_title.items():
+        if title not in sheet_ids:
+            new_id = zlib.crc32(title.encode('utf-8')) & 0x7FFFFFFF
+            while new_id in used_ids:
+                new_id = (new_id + 1) & 0x7FFFFFFF
+            used_ids.add(new_id)
+            sheet_ids[title] = new_id
+            add_requests.append({"addSheet": {"properties": {"sheetId": new_id, "title": title}}})
+        append_requests.append({"appendCells": {
+            "sheetId": sheet_ids[title],
+            "rows": [{"values": [_sheet_cell(row[0]), _sheet_cell(row[1]), _sheet_cell(row[2], is_date=True)]} for row in rows],
+            "fields": "userEnteredValue,userEnteredFormat.numberFormat"}})
+    return add_requests + append_requests
+
+def _sheets_retry_delay_s(attempt):
+    return SHEETS_RETRY_BASE_DELAY_S * 2 ** (attempt - 1) * (1 + random.random() / 2)
+
+def _batch_update_creating_shards(spreadsheet, body, new_titles, max_attempts=SHEETS_WRITE_ATTEMPTS):
+    """Sends a batch containing addSheet requests. batchUpdate is atomic, so after a 5xx the batch was applied
+    exactly when the new worksheets exist. That is checked before reporting failure or retrying, so a lost
+    response is neither reported as a failed save nor resent (which would fail with 'already exists')."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            spreadsheet.batch_update(body)
+            return
+        except gspread.exceptions.APIError as e:
+            if e.code not in SHEETS_RETRYABLE_STATUS_CODES:
+                raise
+            if e.code != 429: # Quota errors are rejected before anything is applied
+                existing = call_sheets_with_retry(fetch_sheet_ids, spreadsheet, max_attempts=SHEETS_READ_ATTEMPTS)
+                if all(title in existing for title in new_titles):
+                    print(f"Sheets error {e.code}, but the routed batch was applied.")
+                    return
+            if attempt == max_attempts:
+                raise
+            delay_s = _sheets_retry_delay_s(attempt)
+            print(f"Sheets error {e.code}, retrying routed batch in {delay_s:.1f}s (attempt {attempt}/{max_attempts}).")
+            time.sleep(delay_s)
+
+def append_to_sharded_sheets(spreadsheet, rows_by_title, sheet_ids, sheet_ids_lock, max_attempts=SHEETS_WRITE_ATTEMPTS):
+    """Creates missing shards and appends all rows in a single spreadsheets.batchUpdate call.
+    sheet_ids is the caller's shared {title: sheetId} cache, guarded by sheet_ids_lock. Requests are built from a
+    copy, and new shards are only added to the cache once the batch has succeeded. Batches that create shards
+    run one at a time, so concurrent saves never add the same worksheet twice. The cache is cleared on failure,
+    so the next save refetches it."""
+    if not spreadsheet or not rows_by_title:
+        return False
+    try:
+        with sheet_ids_lock:
+            if not sheet_ids:
+                sheet_ids.update(call_sheets_with_retry(fetch_sheet_ids, spreadsheet, max_attempts=SHEETS_READ_ATTEMPTS))
+            known_ids = dict(sheet_ids)
+        if all(title in known_ids for title in rows_by_title):
+            call_sheets_with_retry(spreadsheet.batch_update, {"requests": build_sharded_append_requests(rows_by_title, known_ids)},
+                                   max_attempts=max_attempts)
+            return True
+        with sheet_ids_lock:
+            known_ids = dict(sheet_ids) # Another save may have created some of these shards meanwhile
+            new_titles = [title for title in rows_by_title if title not in known_ids]
+            _batch_update_creating_shards(spreadsheet, {"requests": build_sharded_append_requests(rows_by_title, known_ids)},
+                                          new_titles, max_attempts)
+            sheet_ids.update(known_ids)
+        return True
+    except Exception as e:
+        print(f"Error appending to sharded Sheets: {e}")
+        with sheet_ids_lock:
+            sheet_ids.clear()
+        return False
+
+# --- Incremental Local Worksheet Mirror ---
+def _mirror_block_checksum(raw_rows):
+    return hashlib.sha1(json.dumps(raw_rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _pad_sheet_rows(raw_rows):
+    return [[str(v) for v in (list(r) + ["", "", ""])[:3]] for r in raw_rows]
+
+class SheetMirror:
+    """Local SQLite mirror of a worksheet's Name/Price/Date columns, queryable in-process.
+    sync() fetches only the tail block plus any new rows, and re-verifies one older block per call
+    (round-robin), so external edits are picked up by checksum without downloading the whole sheet."""
+    def __init__(self, db_path=SHEET_MIRROR_DB):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS mirror_meta (
+                spreadsheet_id TEXT, worksheet TEXT, row_count INTEGER, verify_cursor INTEGER, synced_at TEXT,
+                PRIMARY KEY (spreadsheet_id, worksheet))""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS mirror_rows (
+                spreadsheet_id TEXT, worksheet TEXT, row_num INTEGER, name TEXT, price REAL, date TEXT,
+                PRIMARY KEY (spreadsheet_id, worksheet, row_num))""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS mirror_blocks (
+                spreadsheet_id TEXT, worksheet TEXT, block_num INTEGER, checksum TEXT,
+                PRIMARY KEY (spreadsheet_id, worksheet, block_num))""")
+
+    def query(self, sql, params=()):
+        """Runs a read query against the mirror (tables: mirror_rows, mirror_meta, mirror_blocks)."""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def rows(self, spreadsheet_id, worksheet_title):
+        return self.query("SELECT row_num, name, price, date FROM mirror_rows WHERE spreadsheet_id=? AND worksheet=? ORDER BY row_num",
+                          (spreadsheet_id, worksheet_title))
+
+    def _fetch(self, worksheet, first_row, last_row=None):
+        """Fetches 1-based sheet rows first_row..last_row (open-ended if None) as padded string lists."""
+        return _pad_sheet_rows(worksheet.get(f"A{first_row}:{SHEET_MIRROR_LAST_COLUMN}{last_row or ''}"))
+
+    def _store_block(self, key, block_num, raw_rows):
+        """Replaces the mirrored rows of one block (raw_rows may be partial for the tail block)."""
+        first_row = block_num * SHEET_MIRROR_BLOCK_ROWS + 1
+        self.conn.execute("DELETE FROM mirror_rows WHERE spreadsheet_id=? AND worksheet=? AND row_num BETWEEN ? AND ?",
+                          key + (first_row, first_row + SHEET_MIRROR_BLOCK_ROWS - 1))
+        records = []
+        for offset, (name, price_str, date) in enumerate(raw_rows):
+            try:
+                price = float(price_str.replace('$', '').replace(',', ''))
+            except ValueError:
+                price = None # Header or non-numeric cell
+            records.append(key + (first_row + offset, name, price, date))
+        self.conn.executemany("INSERT INTO mirror_rows VALUES (?, ?, ?, ?, ?, ?)", records)
+        self.conn.execute("INSERT OR REPLACE INTO mirror_blocks VALUES (?, ?, ?, ?)", key + (block_num, _mirror_block_checksum(raw_rows)))
+
+    def _block_checksum(self, key, block_num):
+        found = self.conn.execute("SELECT checksum FROM mirror_blocks WHERE spreadsheet_id=? AND worksheet=? AND block_num=?",
+                                  key + (block_num,)).fetchone()
+        return found[0] if found else None
+
+    def sync(self, worksheet, spreadsheet_id):
+        """Brings the mirror up to date with at most two range reads. Returns a stats dict."""
+        key = (spreadsheet_id, worksheet.title)
+        stats = {"rows": 0, "new_rows": 0, "changed_blocks": 0, "full_resync": False}
+        with self.lock:
+            meta = self.conn.execute("SELECT row_count, verify_cursor FROM mirror_meta WHERE spreadsheet_id=? AND worksheet=?", key).fetchone()
+            known_rows, verify_cursor = meta if meta else (0, 0)
+
+            # 1) Tail block + anything appended since the last sync, in one read
+            tail_block = max(known_rows - 1, 0) // SHEET_MIRROR_BLOCK_ROWS # Block holding the last known row
+            tail_start = tail_block * SHEET_MIRROR_BLOCK_ROWS
+            fetched = self._fetch(worksheet, tail_start + 1)
+            if len(fetched) < known_rows - tail_start:
+                # Sheet shrank (rows deleted externally): rebuild the mirror from scratch
+                stats["full_resync"] = True
+                fetched = self._fetch(worksheet, 1)
+                known_rows, tail_block, tail_start, verify_cursor = 0, 0, 0, 0
+                self.conn.execute("DELETE FROM mirror_rows WHERE spreadsheet_id=? AND worksheet=?", key)
+                self.conn.execute("DELETE FROM mirror_blocks WHERE spreadsheet_id=? AND worksheet=?", key)
+            total_rows = tail_start + len(fetched)
+            stats["rows"] = total_rows
+            stats["new_rows"] = max(0, total_rows - known_rows)
+
+            with self.conn:
+                for i in range(0, len(fetched), SHEET_MIRROR_BLOCK_ROWS):
+                    block_num = tail_block + i // SHEET_MIRROR_BLOCK_ROWS
+                    block_rows = fetched[i:i + SHEET_MIRROR_BLOCK_ROWS]
+                    if _mirror_block_checksum(block_rows) != self._block_checksum(key, block_num):
+                        self._store_block(key, block_num, block_rows) # Tail edits are picked up here too
+
+                # 2) Re-verify one older block that the tail read did not cover
+                if tail_block > 0:
+                    verify_block = verify_cursor % tail_block
+                    first_row = verify_block * SHEET_MIRROR_BLOCK_ROWS + 1
+                    block_rows = self._fetch(worksheet, first_row, first_row + SHEET_MIRROR_BLOCK_ROWS - 1)
+                    if _mirror_block_checksum(block_rows) != self._block_checksum(key, verify_block):
+                        self._store_block(key, verify_block, block_rows)
+                        stats["changed_blocks"] += 1
+                    verify_cursor = verify_block + 1
+
+                self.conn.execute("INSERT OR REPLACE INTO mirror_meta VALUES (?, ?, ?, ?, ?)",
+                                  key + (total_rows, verify_cursor, datetime.now().isoformat(timespec='seconds')))
+        print(f"Sheet mirror synced '{worksheet.title}': {total_rows} rows, +{stats['new_rows']} new, "
+              f"{stats['changed_blocks']} changed block(s){' (full resync)' if stats['full_resync'] else ''}.")
+        return stats
+
 def append_to_csv(data_row):
     if not data_row:
         return False
@@ -251,11 +1482,25 @@ def append_to_csv(data_row):
         print(f"CSV Error: {e}")
         return False
 
-def append_to_google_sheet_batch(worksheet, list_of_data_rows):
+def call_sheets_with_retry(fn, *args, max_attempts=SHEETS_WRITE_ATTEMPTS, **kwargs):
+    """Calls a gspread function up to max_attempts times, retrying quota and server errors with exponential
+    backoff. A 5xx can arrive after a write was applied, so only pass max_attempts > 1 for writes when
+    duplicates are acceptable."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            if e.code not in SHEETS_RETRYABLE_STATUS_CODES or attempt == max_attempts:
+                raise
+            delay_s = _sheets_retry_delay_s(attempt)
+            print(f"Sheets error {e.code}, retrying in {delay_s:.1f}s (attempt {attempt}/{max_attempts}).")
+            time.sleep(delay_s)
+
+def append_to_google_sheet_batch(worksheet, list_of_data_rows, max_attempts=SHEETS_WRITE_ATTEMPTS):
     if not worksheet or not list_of_data_rows:
         return False
     try:
-        worksheet.append_rows(list_of_data_rows, value_input_option='USER_ENTERED')
+        call_sheets_with_retry(worksheet.append_rows, list_of_data_rows, value_input_option='USER_ENTERED', max_attempts=max_attempts)
         return True
     except Exception as e:
         print(f"Error batch appending to Sheets: {e}")
@@ -263,9 +1508,10 @@ def append_to_google_sheet_batch(worksheet, list_of_data_rows):
 
 # --- Screen Region Selector Class (Unchanged - Code omitted for brevity) ---
 class RegionSelector:
-    def __init__(self, parent_for_after, on_capture_callback):
+    def __init__(self, parent_for_after, on_capture_callback, on_region_callback=None):
         self.parent_for_after = parent_for_after
         self.on_capture_callback = on_capture_callback
+        self.on_region_callback = on_region_callback # Receives the selected (x1, y1, x2, y2) bbox
         self.overlay = customtkinter.CTkToplevel()
         self.overlay.attributes('-fullscreen', True)
         self.overlay.attributes('-alpha', 0.25)
@@ -354,6 +1600,8 @@ class RegionSelector:
         x2, y2 = max(self.start_x, final_canvas_x), max(self.start_y, final_canvas_y)
 
         if x2 - x1 > 5 and y2 - y1 > 5:
+            if self.on_region_callback:
+                self.on_region_callback((int(x1), int(y1), int(x2), int(y2)))
             self.parent_for_after.after(100, lambda: self.grab_screen_region(int(x1), int(y1), int(x2), int(y2)))
         else:
             if self.on_capture_callback:
@@ -380,6 +1628,183 @@ class RegionSelector:
         if self.on_capture_callback:
             self.on_capture_callback(None)
 
+# --- Virtualized Preview Grid ---
+def format_price(price):
+    return f"{price:.0f}" if float(price).is_integer() else f"{price}"
+
+class PreviewGrid:
+    """Editable preview table. A fixed pool of row widgets is rebound to the visible slice of the rows on
+    scroll, so hundreds of rows cost no more widgets than PREVIEW_GRID_VISIBLE_ROWS."""
+    def __init__(self, parent, on_change=None, visible_rows=PREVIEW_GRID_VISIBLE_ROWS):
+        self.on_change = None
+        self.rows = [] # Each: {"values": [name, price, date], "include": bool}
+        self.offset = 0
+        self.frame = customtkinter.CTkFrame(parent, fg_color="transparent")
+        self.frame.grid_columnconfigure(1, weight=1)
+        header_font = customtkinter.CTkFont(size=10, weight="bold")
+        for col, title in enumerate(["", "Name", "Price", "Date"]):
+            customtkinter.CTkLabel(self.frame, text=title, font=header_font, height=16).grid(row=0, column=col, sticky="w", padx=2)
+        self.count_label = customtkinter.CTkLabel(self.frame, text="", font=customtkinter.CTkFont(size=10), height=16)
+        self.count_label.grid(row=0, column=4, sticky="e")
+
+        self.pool = []
+        for slot in range(visible_rows):
+            include_var = customtkinter.BooleanVar(value=True)
+            name_var, price_var, date_var = (customtkinter.StringVar() for _ in range(3))
+            widgets = {
+                "include_var": include_var, "name_var": name_var, "price_var": price_var, "date_var": date_var,
+                "check": customtkinter.CTkCheckBox(self.frame, text="", width=20, variable=include_var,
+                                                    command=lambda s=slot: self._toggle_include(s)),
+                "name": customtkinter.CTkEntry(self.frame, textvariable=name_var, height=24),
+                "price": customtkinter.CTkEntry(self.frame, textvariable=price_var, width=80, height=24),
+                "date": customtkinter.CTkEntry(self.frame, textvariable=date_var, width=85, height=24),
+            }
+            for col, key in enumerate(["check", "name", "price", "date"]):
+                widgets[key].grid(row=slot + 1, column=col, sticky="ew", padx=2, pady=1)
+                widgets[key].bind("<MouseWheel>", self._on_mousewheel)
+                widgets[key].bind("<Button-4>", self._on_mousewheel)
+                widgets[key].bind("<Button-5>", self._on_mousewheel)
+                if key != "check":
+                    widgets[key].bind("<Return>", lambda e, s=slot: self._commit_slot(s))
+                    widgets[key].bind("<FocusOut>", lambda e, s=slot: self._commit_slot(s))
+            self.pool.append(widgets)
+        self.scrollbar = customtkinter.CTkScrollbar(self.frame, orientation="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=4, rowspan=visible_rows, sticky="nse")
+        self._refresh()
+        self.on_change = on_change # Called with the number of included rows after any change
+
+    # --- Data ---
+    @staticmethod
+    def _new_row(values):
+        return {"values": list(values), "include": True, "ocr_values": tuple(values)} # ocr_values: as OCR'd, before edits
+
+    def set_rows(self, list_of_rows):
+        self.rows = [self._new_row(r) for r in (list_of_rows or [])]
+        self.offset = 0
+        self._refresh()
+
+    def append_rows(self, list_of_rows):
+        """Adds rows without touching existing ones; only refreshes widgets if the new rows are visible."""
+        first_new = len(self.rows)
+        self.rows.extend(self._new_row(r) for r in list_of_rows)
+        if first_new < self.offset + len(self.pool):
+            self._commit_visible() # Keep edits typed into visible rows before the slots are rebound
+            self._refresh()
+        else:
+            self._update_scrollbar_and_count()
+
+    def reconcile_rows(self, list_of_rows):
+        """Brings streamed-in rows in line with a finished OCR result. Rows the result still contains keep their
+        include choice and edits, and the scroll position is kept; only rows the result changed (e.g. after the
+        retry ladder) are replaced. Returns True if anything changed."""
+        final_rows = list_of_rows or []
+        matcher = difflib.SequenceMatcher(None, [r["ocr_values"] for r in self.rows], [tuple(r) for r in final_rows], autojunk=False)
+        opcodes = matcher.get_opcodes()
+        if all(tag == "equal" for tag, *_ in opcodes):
+            return False
+        self._commit_visible()
+        merged = []
+        for tag, old_start, old_end, new_start, new_end in opcodes:
+            if tag == "equal":
+                merged.extend(self.rows[old_start:old_end])
+            else:
+                merged.extend(self._new_row(r) for r in final_rows[new_start:new_end])
+        self.rows = merged
+        self.offset = max(0, min(self.offset, len(self.rows) - len(self.pool)))
+        self._refresh()
+        return True
+
+    def get_included_rows(self):
+        self._commit_visible()
+        return [list(r["values"]) for r in self.rows if r["include"]]
+
+    def included_count(self):
+        return sum(1 for r in self.rows if r["include"])
+
+    # --- Widget binding ---
+    def _refresh(self):
+        for slot, widgets in enumerate(self.pool):
+            row_idx = self.offset + slot
+            if row_idx < len(self.rows):
+                row = self.rows[row_idx]
+                name, price, date = row["values"]
+                widgets["name_var"].set(str(name))
+                widgets["price_var"].set(format_price(price))
+                widgets["date_var"].set(str(date))
+                widgets["include_var"].set(row["include"])
+                state = "normal"
+            else:
+                for key in ("name_var", "price_var", "date_var"):
+                    widgets[key].set("")
+                widgets["include_var"].set(False)
+                state = "disabled"
+            for key in ("check", "name", "price", "date"):
+                widgets[key].configure(state=state)
+        self._update_scrollbar_and_count()
+
+    def _update_scrollbar_and_count(self):
+        total = len(self.rows)
+        if total <= len(self.pool):
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + len(self.pool)) / total)
+        included = self.included_count()
+        self.count_label.configure(text=f"{included}/{total}" if total else "")
+        if self.on_change:
+            self.on_change(included)
+
+    def _commit_slot(self, slot):
+        """Writes an edited slot back to its row; invalid price/date edits are reverted."""
+        row_idx = self.offset + slot
+        if row_idx >= len(self.rows):
+            return
+        widgets = self.pool[slot]
+        row = self.rows[row_idx]
+        name = widgets["name_var"].get().strip() or row["values"][0]
+        price = row["values"][1]
+        try:
+            price = float(widgets["price_var"].get().replace('$', '').replace(',', ''))
+        except ValueError:
+            widgets["price_var"].set(format_price(price))
+        date = widgets["date_var"].get().strip()
+        try:
+            datetime.strptime(date, '%d/%m/%Y')
+        except ValueError:
+            date = row["values"][2]
+            widgets["date_var"].set(date)
+        row["values"] = [name, price, date]
+
+    def _commit_visible(self):
+        for slot in range(min(len(self.pool), len(self.rows) - self.offset)):
+            self._commit_slot(slot)
+
+    def _toggle_include(self, slot):
+        row_idx = self.offset + slot
+        if row_idx < len(self.rows):
+            self.rows[row_idx]["include"] = self.pool[slot]["include_var"].get()
+            self._update_scrollbar_and_count()
+
+    # --- Scrolling ---
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.rows) - len(self.pool)))
+        if offset != self.offset:
+            self._commit_visible()
+            self.offset = offset
+            self._refresh()
+
+    def _on_scrollbar(self, action, value, units=None):
+        if action == 'moveto':
+            self.scroll_to(int(round(float(value) * len(self.rows))))
+        elif action == 'scroll':
+            self.scroll_to(self.offset + int(value))
+
+    def _on_mousewheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - 1)
+        else:
+            self.scroll_to(self.offset + 1)
+        return "break"
+
 # --- GUI Application ---
 class GTLHelperApp:
     def __init__(self, root_window):
@@ -394,15 +1819,37 @@ class GTLHelperApp:
         self.app_settings = load_app_settings()
         self.current_spreadsheet_id = self.app_settings.get("spreadsheet_id")
         self.current_worksheet_name = self.app_settings.get("worksheet_name", "Sheet1")
+        apply_ocr_profile(self.app_settings.get("ocr_profile"))
+        apply_ocr_model(self.app_settings.get("ocr_model"), self.app_settings.get("tessdata_dir"))
+        self.item_catalog = ItemCatalog()
+        self.sheet_mirror = SheetMirror() if self.app_settings.get("mirror_worksheet") else None
+        self.worksheet_routing = self.app_settings.get("worksheet_routing")
+        if self.worksheet_routing not in WORKSHEET_ROUTING_MODES:
+            self.worksheet_routing = None
+        self.item_categories = load_item_categories() if self.worksheet_routing == "category" else {}
+        self.shard_sheet_ids = {} # {worksheet title: sheetId}, filled on the first routed save
+        self.sheets_write_attempts = max(1, int(self.app_settings.get("sheets_write_attempts") or 1))
+        self.shard_sheet_ids_lock = threading.Lock()
+        self.capture_archive = CaptureArchive()
+        self.current_capture_digest = None
+        self.remembered_region = self.app_settings.get("remembered_region")
+        self.hotkey_listener = None
+        self.start_quick_capture_hotkey()
+        self.ocr_server = None
+        if self.app_settings.get("ocr_server_port"):
+            self.ocr_server = start_ocr_server(
+                OcrService(self.item_catalog, process_workers=int(self.app_settings.get("ocr_process_workers") or 0)),
+                int(self.app_settings["ocr_server_port"]))
 
         self.layout_is_mini = False
-        self.normal_geom = "580x295" # Adjusted height slightly for explanation label
+        self.normal_geom = "580x455" # Room for the preview grid and explanation label
         self.mini_geom = "170x165" 
         self.icon_size_normal = (18, 18)
         self.icon_size_mini_action = (26, 26)
         self.icon_size_mini_layout_toggle = (20, 20)
         self.save_to_sheets_var = customtkinter.BooleanVar(value=True)
         self.save_to_csv_var = customtkinter.BooleanVar(value=True)
+        self.archive_captures_var = customtkinter.BooleanVar(value=bool(self.app_settings.get("archive_captures")))
 
         self.icons = {}
         self.icons_mini = {}
@@ -435,18 +1882,28 @@ class GTLHelperApp:
         self.content_frame = customtkinter.CTkFrame(self.root, corner_radius=0, fg_color="transparent")
         self.content_frame.pack(fill="both", expand=True, padx=3, pady=3)
         self.status_label = customtkinter.CTkLabel(self.content_frame, text="Authenticating...", anchor="w", font=customtkinter.CTkFont(size=10))
-        self.top_controls_frame = customtkinter.CTkFrame(self.content_frame)
+        self.status_label.pack(side="bottom", fill="x", padx=2, pady=(2, 2))
+        try: 
+            self.status_default_color = customtkinter.ThemeManager.theme["CTkLabel"]["text_color"]
+        except:
+            self.status_default_color = "#FFFFFF" 
+        self.status_error_color = "#FF5555"
+        self.pending_status = None
+        self.shown_status = None
+        self.status_flush_scheduled = False
+
+        # --- Normal layout (built once, swapped in/out by show_current_layout) ---
+        self.normal_layout_frame = customtkinter.CTkFrame(self.content_frame, fg_color="transparent")
+        self.top_controls_frame = customtkinter.CTkFrame(self.normal_layout_frame)
         self.capture_region_btn = customtkinter.CTkButton(self.top_controls_frame, command=self.start_region_capture)
         self.preview_clipboard_btn = customtkinter.CTkButton(self.top_controls_frame, command=self.preview_listing_from_clipboard)
         self.save_btn = customtkinter.CTkButton(self.top_controls_frame, command=self.save_listing_action, fg_color="#28A745", hover_color="#218838", state="disabled")
-        self.preview_frame = customtkinter.CTkFrame(self.content_frame, fg_color="transparent")
-        self.preview_text_var = customtkinter.StringVar(value="Preview")
-        self.preview_entry = customtkinter.CTkEntry(self.preview_frame, textvariable=self.preview_text_var, state="readonly", justify="center", font=customtkinter.CTkFont(size=11))
-        self.settings_control_frame = customtkinter.CTkFrame(self.content_frame, fg_color="transparent")
+        self.settings_control_frame = customtkinter.CTkFrame(self.normal_layout_frame, fg_color="transparent")
         self.settings_toggle_btn = customtkinter.CTkButton(self.settings_control_frame, command=self.toggle_settings_visibility)
-        self.layout_toggle_btn_for_mini = customtkinter.CTkButton(self.settings_control_frame, command=self.toggle_app_layout)
+        self.preview_frame = customtkinter.CTkFrame(self.normal_layout_frame, fg_color="transparent")
+        self.preview_grid = PreviewGrid(self.preview_frame, on_change=self.on_preview_rows_changed)
         
-        self.actual_settings_options_frame = customtkinter.CTkFrame(self.content_frame)
+        self.actual_settings_options_frame = customtkinter.CTkFrame(self.normal_layout_frame)
         self.sheet_selection_frame = customtkinter.CTkFrame(self.actual_settings_options_frame)
         
         self.sheet_id_label = customtkinter.CTkLabel(self.sheet_selection_frame, text="Sheet URL/ID:")
@@ -473,9 +1930,30 @@ class GTLHelperApp:
 
         self.sheets_check = customtkinter.CTkCheckBox(self.actual_settings_options_frame, text="Sheets", variable=self.save_to_sheets_var)
         self.csv_check = customtkinter.CTkCheckBox(self.actual_settings_options_frame, text="CSV", variable=self.save_to_csv_var)
+        self.archive_check = customtkinter.CTkCheckBox(self.actual_settings_options_frame, text="Archive", variable=self.archive_captures_var, command=self.toggle_capture_archive)
         self.layout_toggle_btn_in_settings = customtkinter.CTkButton(self.actual_settings_options_frame, command=self.toggle_app_layout)
+        self.import_catalog_btn = customtkinter.CTkButton(self.actual_settings_options_frame, text="Import Items", command=self.import_item_catalog)
+
+        # --- Mini layout (built once) ---
+        self.mini_layout_frame = customtkinter.CTkFrame(self.content_frame, fg_color="transparent")
+        self.mini_top_controls_frame = customtkinter.CTkFrame(self.mini_layout_frame)
+        self.mini_capture_region_btn = customtkinter.CTkButton(self.mini_top_controls_frame, command=self.start_region_capture)
+        self.mini_preview_clipboard_btn = customtkinter.CTkButton(self.mini_top_controls_frame, command=self.preview_listing_from_clipboard)
+        self.mini_save_btn = customtkinter.CTkButton(self.mini_top_controls_frame, command=self.save_listing_action, fg_color="#28A745", hover_color="#218838", state="disabled")
+        self.mini_preview_frame = customtkinter.CTkFrame(self.mini_layout_frame, fg_color="transparent")
+        self.preview_text_var = customtkinter.StringVar(value="Preview")
+        self.preview_entry = customtkinter.CTkEntry(self.mini_preview_frame, textvariable=self.preview_text_var, state="readonly", justify="center", font=customtkinter.CTkFont(size=11))
+        self.mini_settings_control_frame = customtkinter.CTkFrame(self.mini_layout_frame, fg_color="transparent")
+        self.layout_toggle_btn_for_mini = customtkinter.CTkButton(self.mini_settings_control_frame, command=self.toggle_app_layout)
+        self.save_buttons = (self.save_btn, self.mini_save_btn)
+
         self.current_structured_preview_data = None
+        self.save_in_progress = False
+        self.ocr_in_progress = False
+        self.ocr_job_id = 0
         self.show_settings_expanded = customtkinter.BooleanVar(value=False)
+        self.build_normal_layout()
+        self.build_mini_layout()
         
         self.root.after(50, self.initialize_google_auth_and_ui)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing) # Keep if any cleanup, otherwise remove
@@ -483,6 +1961,11 @@ class GTLHelperApp:
     def on_closing(self):
         # Add any other cleanup logic if needed in the future
         print("Closing GTLHelper App.")
+        if self.hotkey_listener:
+            self.hotkey_listener.stop()
+        if self.ocr_server:
+            self.ocr_server.shutdown()
+            self.ocr_server.ocr_service.shutdown()
         self.root.destroy()
 
     def initialize_google_auth_and_ui(self):
@@ -507,7 +1990,7 @@ class GTLHelperApp:
             self.sheets_check.configure(state="normal" if self.gspread_client and self.worksheet else "disabled")
             if not self.gspread_client or not self.worksheet:
                 self.save_to_sheets_var.set(False)
-        self.rebuild_ui_for_mode()
+        self.show_current_layout()
 
     def set_target_sheet(self): # Renamed from set_target_sheet_from_input
         input_val = self.sheet_id_var.get().strip()
@@ -559,6 +2042,9 @@ class GTLHelperApp:
                 self.current_worksheet_name = self.worksheet.title
 
             print(f"Loaded worksheet: '{self.worksheet.title}' from spreadsheet ID: {self.current_spreadsheet_id}")
+            with self.shard_sheet_ids_lock:
+                self.shard_sheet_ids.clear()
+            self.sync_sheet_mirror_async()
             return True
         except gspread.exceptions.APIError as e:
             print(f"gspread API Error: {e}")
@@ -581,205 +2067,183 @@ class GTLHelperApp:
             self.worksheet = None
             return False
 
-    def rebuild_ui_for_mode(self):
-        for w in self.content_frame.winfo_children():
-            w.pack_forget()
+    def sync_sheet_mirror_async(self):
+        """Incrementally syncs the local worksheet mirror in the background (no-op if disabled)."""
+        if not self.sheet_mirror or not self.worksheet:
+            return
+        worksheet, spreadsheet_id = self.worksheet, self.current_spreadsheet_id
+        def _sync():
+            try:
+                self.sheet_mirror.sync(worksheet, spreadsheet_id)
+            except Exception as e:
+                print(f"Sheet mirror sync failed: {e}")
+        threading.Thread(target=_sync, daemon=True).start()
 
+    def build_mini_layout(self):
         sml_pad, norm_pad = 2, 5
-        btn_h_norm, btn_h_mini_act, btn_h_mini_tog = 28, 36, 28
-        btn_w_norm_txt = 120 
+        btn_h_mini_act, btn_h_mini_tog = 36, 28
         btn_w_mini_act, btn_w_mini_tog = 36, 80
 
-        current_save_state = "normal" if self.current_structured_preview_data else "disabled"
-        common_btn_config = {
-            "capture": {"command": self.start_region_capture},
-            "clipboard": {"command": self.preview_listing_from_clipboard},
-            "save": {"command": self.save_listing_action, "fg_color": "#28A745",
-                     "hover_color": "#218838", "state": current_save_state},
-        }
+        mini_buttons = [(self.mini_capture_region_btn, "capture"), (self.mini_preview_clipboard_btn, "clipboard"), (self.mini_save_btn, "save")]
+        for btn, icon_name in mini_buttons:
+            icon = self.icons_mini.get(icon_name)
+            is_image = isinstance(icon, customtkinter.CTkImage)
+            btn.configure(image=icon if is_image else None, text="" if is_image else self.icon_text_fallbacks[icon_name],
+                          width=btn_w_mini_act, height=btn_h_mini_act, compound="top")
+            btn.pack(side="left", padx=sml_pad, pady=sml_pad, expand=True)
+        self.mini_top_controls_frame.pack(side="top", fill="x", padx=sml_pad, pady=(sml_pad, 0))
+
+        self.mini_preview_frame.pack(side="top", fill="x", padx=sml_pad, pady=(sml_pad, 0))
+        self.preview_entry.pack(fill="x", ipady=1, padx=sml_pad)
+        
+        self.mini_settings_control_frame.pack(side="top", fill="x", padx=sml_pad, pady=(norm_pad, sml_pad))
+        layout_icon_mini = self.icons_mini.get("layout")
+        layout_txt_mini = "Full" if layout_icon_mini and isinstance(layout_icon_mini, customtkinter.CTkImage) else self.icon_text_fallbacks["layout"] + " Full"
+        layout_compound_mini = "left" if layout_icon_mini and isinstance(layout_icon_mini, customtkinter.CTkImage) else "top"
+        self.layout_toggle_btn_for_mini.configure(
+            image=layout_icon_mini if isinstance(layout_icon_mini, customtkinter.CTkImage) else None,
+            text=layout_txt_mini, compound=layout_compound_mini,
+            height=btn_h_mini_tog, width=btn_w_mini_tog
+        )
+        self.layout_toggle_btn_for_mini.pack(side="top", padx=sml_pad, pady=sml_pad, expand=True)
+
+    def build_normal_layout(self):
+        sml_pad, norm_pad = 2, 5
+        btn_h_norm = 28
+        btn_w_norm_txt = 120 
 
-        self.status_label.pack(side="bottom", fill="x", padx=sml_pad, pady=(sml_pad, sml_pad))
+        normal_buttons = [(self.capture_region_btn, "capture", "Capture"), (self.preview_clipboard_btn, "clipboard", "Clipboard"), (self.save_btn, "save", "Save")]
+        for btn, icon_name, label in normal_buttons:
+            icon = self.icons.get(icon_name)
+            is_image = isinstance(icon, customtkinter.CTkImage)
+            btn.configure(image=icon if is_image else None, text=label if is_image else self.icon_text_fallbacks[icon_name],
+                          compound="left", width=btn_w_norm_txt, height=btn_h_norm)
+            btn.pack(side="left", padx=norm_pad, pady=norm_pad, expand=True)
         self.top_controls_frame.pack(side="top", fill="x", padx=sml_pad, pady=(sml_pad, 0))
 
+        self.settings_control_frame.pack(side="top", fill="x", padx=norm_pad, pady=(norm_pad, 0))
+        self.update_settings_toggle_text()
+        self.settings_toggle_btn.pack(side="top", fill="x")
+
+        # Settings panel contents are packed once; the panel itself is shown/hidden by toggle_settings_visibility
+        self.sheet_selection_frame.pack(side="top", fill="x", pady=(0, sml_pad)) # Reduced bottom padding
+        self.sheet_id_label.pack(side="left", padx=(0, sml_pad))
+        self.sheet_id_entry.pack(side="left", expand=True, fill="x", padx=(0,sml_pad))
+        self.set_sheet_btn.pack(side="left", padx=(0,0)) # Removed picker button
+        self.sheet_id_explanation_label.pack(side="top", fill="x", pady=(sml_pad, norm_pad), padx=sml_pad)
+        self.sheets_check.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
+        self.csv_check.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
+        self.archive_check.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
+
+        layout_icon_norm = self.icons.get("layout")
+        layout_text_norm = "Mini" if layout_icon_norm and isinstance(layout_icon_norm, customtkinter.CTkImage) else self.icon_text_fallbacks["layout"] + " Mini"
+        layout_compound_norm = "left" if layout_icon_norm and isinstance(layout_icon_norm, customtkinter.CTkImage) else "top"
+        self.layout_toggle_btn_in_settings.configure(
+            image=layout_icon_norm if isinstance(layout_icon_norm, customtkinter.CTkImage) else None,
+            text=layout_text_norm, compound=layout_compound_norm, height=btn_h_norm
+        )
+        self.layout_toggle_btn_in_settings.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
+        self.import_catalog_btn.configure(height=btn_h_norm, width=btn_w_norm_txt)
+        self.import_catalog_btn.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
+
+        self.preview_frame.pack(side="top", fill="both", expand=True, padx=norm_pad, pady=norm_pad)
+        self.preview_grid.frame.pack(fill="both", expand=True, padx=sml_pad)
+
+    def update_settings_toggle_text(self):
+        settings_icon_obj = self.icons.get("settings")
+        arrow = "▴" if self.show_settings_expanded.get() else "▾"
+        settings_text_val = f"Settings {arrow}" 
+        settings_compound = "left" if settings_icon_obj and isinstance(settings_icon_obj, customtkinter.CTkImage) else "top"
+        self.settings_toggle_btn.configure(
+            image=settings_icon_obj if isinstance(settings_icon_obj, customtkinter.CTkImage) else None,
+            text=settings_text_val if settings_icon_obj and isinstance(settings_icon_obj, customtkinter.CTkImage) else self.icon_text_fallbacks["settings"] + arrow,
+            compound=settings_compound, height=28
+        )
+
+    def show_current_layout(self):
+        """Swaps the pre-built normal/mini layout frames; nothing is rebuilt."""
         if self.layout_is_mini:
+            self.normal_layout_frame.pack_forget()
+            self.mini_layout_frame.pack(side="top", fill="both", expand=True)
             self.root.geometry(self.mini_geom)
-            cap_icon = self.icons_mini.get("capture")
-            cap_txt = "" if cap_icon and isinstance(cap_icon, customtkinter.CTkImage) else self.icon_text_fallbacks["capture"]
-            clip_icon = self.icons_mini.get("clipboard")
-            clip_txt = "" if clip_icon and isinstance(clip_icon, customtkinter.CTkImage) else self.icon_text_fallbacks["clipboard"]
-            save_icon_mini = self.icons_mini.get("save")
-            save_txt_mini = "" if save_icon_mini and isinstance(save_icon_mini, customtkinter.CTkImage) else self.icon_text_fallbacks["save"]
-
-            self.capture_region_btn.configure(
-                image=cap_icon if isinstance(cap_icon, customtkinter.CTkImage) else None,
-                text=cap_txt, width=btn_w_mini_act, height=btn_h_mini_act, compound="top",
-                **common_btn_config["capture"]
-            )
-            self.preview_clipboard_btn.configure(
-                image=clip_icon if isinstance(clip_icon, customtkinter.CTkImage) else None,
-                text=clip_txt, width=btn_w_mini_act, height=btn_h_mini_act, compound="top",
-                **common_btn_config["clipboard"]
-            )
-            self.save_btn.configure(
-                image=save_icon_mini if isinstance(save_icon_mini, customtkinter.CTkImage) else None,
-                text=save_txt_mini, width=btn_w_mini_act, height=btn_h_mini_act, compound="top",
-                **common_btn_config["save"]
-            )
-
-            self.capture_region_btn.pack(side="left", padx=sml_pad, pady=sml_pad, expand=True)
-            self.preview_clipboard_btn.pack(side="left", padx=sml_pad, pady=sml_pad, expand=True)
-            self.save_btn.pack(side="left", padx=sml_pad, pady=sml_pad, expand=True)
-
-            self.preview_frame.pack(side="top", fill="x", padx=sml_pad, pady=(sml_pad, 0))
-            self.preview_entry.pack(fill="x", ipady=1, padx=sml_pad)
-            
-            self.settings_control_frame.pack(side="top", fill="x", padx=sml_pad, pady=(norm_pad, sml_pad))
-            layout_icon_mini = self.icons_mini.get("layout")
-            layout_txt_mini = "Full" if layout_icon_mini and isinstance(layout_icon_mini, customtkinter.CTkImage) else self.icon_text_fallbacks["layout"] + " Full"
-            layout_compound_mini = "left" if layout_icon_mini and isinstance(layout_icon_mini, customtkinter.CTkImage) else "top"
-            self.layout_toggle_btn_for_mini.configure(
-                image=layout_icon_mini if isinstance(layout_icon_mini, customtkinter.CTkImage) else None,
-                text=layout_txt_mini, compound=layout_compound_mini,
-                height=btn_h_mini_tog, width=btn_w_mini_tog
-            )
-            self.layout_toggle_btn_for_mini.pack(side="top", padx=sml_pad, pady=sml_pad, expand=True) # Changed from left
-            
-            self.settings_toggle_btn.pack_forget()
-            self.actual_settings_options_frame.pack_forget() 
-
-        else:  # Normal layout
+        else:
+            self.mini_layout_frame.pack_forget()
+            self.normal_layout_frame.pack(side="top", fill="both", expand=True)
             self.root.geometry(self.normal_geom)
-            cap_icon_norm = self.icons.get("capture")
-            cap_txt_norm = "Capture" if cap_icon_norm and isinstance(cap_icon_norm, customtkinter.CTkImage) else self.icon_text_fallbacks["capture"]
-            clip_icon_norm = self.icons.get("clipboard")
-            clip_txt_norm = "Clipboard" if clip_icon_norm and isinstance(clip_icon_norm, customtkinter.CTkImage) else self.icon_text_fallbacks["clipboard"]
-            save_icon_norm = self.icons.get("save")
-            save_txt_norm = "Save" if save_icon_norm and isinstance(save_icon_norm, customtkinter.CTkImage) else self.icon_text_fallbacks["save"]
-
-            self.capture_region_btn.configure(
-                image=cap_icon_norm if isinstance(cap_icon_norm, customtkinter.CTkImage) else None,
-                text=cap_txt_norm, compound="left", width=btn_w_norm_txt, height=btn_h_norm,
-                **common_btn_config["capture"]
-            )
-            self.preview_clipboard_btn.configure(
-                image=clip_icon_norm if isinstance(clip_icon_norm, customtkinter.CTkImage) else None,
-                text=clip_txt_norm, compound="left", width=btn_w_norm_txt, height=btn_h_norm,
-                **common_btn_config["clipboard"]
-            )
-            self.save_btn.configure(
-                image=save_icon_norm if isinstance(save_icon_norm, customtkinter.CTkImage) else None,
-                text=save_txt_norm, compound="left", width=btn_w_norm_txt, height=btn_h_norm,
-                **common_btn_config["save"]
-            )
 
-            self.capture_region_btn.pack(side="left", padx=norm_pad, pady=norm_pad, expand=True)
-            self.preview_clipboard_btn.pack(side="left", padx=norm_pad, pady=norm_pad, expand=True)
-            self.save_btn.pack(side="left", padx=norm_pad, pady=norm_pad, expand=True)
-
-            self.settings_control_frame.pack(side="top", fill="x", padx=norm_pad, pady=(norm_pad, 0))
-            settings_icon_obj = self.icons.get("settings")
-            arrow = "▴" if self.show_settings_expanded.get() else "▾"
-            settings_text_val = f"Settings {arrow}" 
-            settings_compound = "left" if settings_icon_obj and isinstance(settings_icon_obj, customtkinter.CTkImage) else "top"
-            self.settings_toggle_btn.configure(
-                image=settings_icon_obj if isinstance(settings_icon_obj, customtkinter.CTkImage) else None,
-                text=settings_text_val if settings_icon_obj and isinstance(settings_icon_obj, customtkinter.CTkImage) else self.icon_text_fallbacks["settings"] + arrow,
-                compound=settings_compound, height=btn_h_norm
-            )
-            self.settings_toggle_btn.pack(side="top", fill="x")
-            self.layout_toggle_btn_for_mini.pack_forget()
-
-            if self.show_settings_expanded.get():
-                self.actual_settings_options_frame.pack(side="top", fill="x", pady=(sml_pad, 0), padx=norm_pad)
-                self.sheet_selection_frame.pack(side="top", fill="x", pady=(0, sml_pad)) # Reduced bottom padding
-                
-                self.sheet_id_label.pack(side="left", padx=(0, sml_pad))
-                self.sheet_id_entry.pack(side="left", expand=True, fill="x", padx=(0,sml_pad))
-                self.set_sheet_btn.pack(side="left", padx=(0,0)) # Removed picker button
-
-                # Pack the explanation label
-                self.sheet_id_explanation_label.pack(side="top", fill="x", pady=(sml_pad, norm_pad), padx=sml_pad)
-
-                self.sheets_check.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
-                self.csv_check.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
-
-                layout_icon_norm = self.icons.get("layout")
-                layout_text_norm = "Mini" if layout_icon_norm and isinstance(layout_icon_norm, customtkinter.CTkImage) else self.icon_text_fallbacks["layout"] + " Mini"
-                layout_compound_norm = "left" if layout_icon_norm and isinstance(layout_icon_norm, customtkinter.CTkImage) else "top"
-                self.layout_toggle_btn_in_settings.configure(
-                    image=layout_icon_norm if isinstance(layout_icon_norm, customtkinter.CTkImage) else None,
-                    text=layout_text_norm, compound=layout_compound_norm, height=btn_h_norm
-                )
-                self.layout_toggle_btn_in_settings.pack(side="left", padx=norm_pad, pady=(0, norm_pad), expand=True)
-            else:
-                self.actual_settings_options_frame.pack_forget()
-
-            self.preview_frame.pack(side="top", fill="both", expand=True, padx=norm_pad, pady=norm_pad)
-            self.preview_entry.pack(fill="x", expand=True, ipady=5, padx=sml_pad)
-
-        self.update_preview_display(self.current_structured_preview_data)
+        self.refresh_preview_summary()
         # Update status based on whether GSheet client is available and using broad scope.
         status_scope_msg = "Scope: spreadsheets (full)" if self.gspread_client else "Scope: (Auth Needed)"
         self.update_status_text_only(f"Mode: {'Mini' if self.layout_is_mini else 'Normal'}. {status_scope_msg}")
 
-
     def toggle_app_layout(self):
         self.layout_is_mini = not self.layout_is_mini
         if self.layout_is_mini and self.show_settings_expanded.get():
             self.show_settings_expanded.set(False)
-        self.rebuild_ui_for_mode()
+            self.actual_settings_options_frame.pack_forget()
+            self.update_settings_toggle_text()
+        self.show_current_layout()
 
     def toggle_settings_visibility(self):
-        if self.layout_is_mini: 
-            self.layout_is_mini = False 
+        switch_to_normal = self.layout_is_mini
+        self.layout_is_mini = False 
         self.show_settings_expanded.set(not self.show_settings_expanded.get())
-        self.rebuild_ui_for_mode()
+        if self.show_settings_expanded.get():
+            self.actual_settings_options_frame.pack(side="top", fill="x", pady=(2, 0), padx=5, before=self.preview_frame)
+        else:
+            self.actual_settings_options_frame.pack_forget()
+        self.update_settings_toggle_text()
+        if switch_to_normal:
+            self.show_current_layout()
 
     def update_status(self, message, error=False):
-        ec = "#FF5555"
-        try: 
-            dc = customtkinter.ThemeManager.theme["CTkLabel"]["text_color"]
-        except:
-            dc = "#FFFFFF" 
-        self.status_label.configure(text=message, text_color=(ec if error else dc))
-        if self.root and self.root.winfo_exists(): self.root.update_idletasks()
-
+        """Queues a status message. Updates within one frame collapse into a single label redraw."""
+        self.pending_status = (message, self.status_error_color if error else self.status_default_color)
+        if not self.status_flush_scheduled:
+            self.status_flush_scheduled = True
+            self.root.after(STATUS_REDRAW_INTERVAL_MS, self.flush_status)
 
     def update_status_text_only(self, message):
-        try:
-            dc = customtkinter.ThemeManager.theme["CTkLabel"]["text_color"]
-        except:
-            dc = "#FFFFFF"
-        self.status_label.configure(text=message, text_color=dc)
-        if self.root and self.root.winfo_exists(): self.root.update_idletasks()
+        self.update_status(message)
+
+    def flush_status(self):
+        self.status_flush_scheduled = False
+        if self.pending_status and self.pending_status != self.shown_status:
+            message, color = self.pending_status
+            self.status_label.configure(text=message, text_color=color)
+            self.shown_status = self.pending_status
 
     def update_preview_display(self, list_of_structured_data):
         self.current_structured_preview_data = list_of_structured_data
+        self.preview_grid.set_rows(list_of_structured_data) # Also refreshes the summary via on_change
+
+    def on_preview_rows_changed(self, included_count):
+        self.refresh_preview_summary()
+
+    def refresh_preview_summary(self):
+        """Updates the mini-mode summary text and Save buttons from the rows currently included in the grid."""
+        included_rows = [r["values"] for r in self.preview_grid.rows if r["include"]]
         save_btn_state = "disabled"
 
-        if list_of_structured_data and isinstance(list_of_structured_data, list) and len(list_of_structured_data) > 0:
+        if included_rows:
             save_btn_state = "normal"
-            first_item = list_of_structured_data[0]
-            item_count = len(list_of_structured_data)
+            first_item = included_rows[0]
+            item_count = len(included_rows)
             count_str = f" ({item_count})" if item_count > 1 else ""
-
-            if self.layout_is_mini:
-                name_prev = str(first_item[0])
-                price_prev = first_item[1]
-                disp_text = f"{name_prev[:6]}..|{price_prev:.0f}{count_str}" if len(name_prev) > 6 else f"{name_prev}|{price_prev:.0f}{count_str}"
-            else:
-                if item_count == 1:
-                    disp_text = f"Name: {first_item[0]} | Price: {first_item[1]:.0f} | Date: {first_item[2]}"
-                else:
-                    disp_text = f"{item_count} items. 1st: {first_item[0]} | {first_item[1]:.0f} | {first_item[2]}"
+            name_prev = str(first_item[0])
+            price_prev = first_item[1]
+            disp_text = f"{name_prev[:6]}..|{price_prev:.0f}{count_str}" if len(name_prev) > 6 else f"{name_prev}|{price_prev:.0f}{count_str}"
             self.preview_text_var.set(disp_text)
         else:
-            self.preview_text_var.set("..." if self.layout_is_mini else "No preview data.")
+            self.preview_text_var.set("...")
 
-        if hasattr(self, 'save_btn') and self.save_btn and self.save_btn.winfo_exists():
-            self.save_btn.configure(state=save_btn_state)
-        if self.root and self.root.winfo_exists(): self.root.update_idletasks()
+        if not self.save_in_progress:
+            self.set_save_buttons_state("disabled" if self.ocr_in_progress else save_btn_state)
 
+    def set_save_buttons_state(self, state):
+        for btn in self.save_buttons:
+            if btn.winfo_exists():
+                btn.configure(state=state)
 
     def _process_image_for_preview(self, image_object, is_region_capture=False):
         if image_object is None:
@@ -787,30 +2251,67 @@ class GTLHelperApp:
             self.update_status("Capture fail/cancel.", error=True)
             return
 
+        # OCR runs off the Tk thread; progress and rows are marshalled back with root.after.
+        # A newer capture supersedes an older one still running (results checked against ocr_job_id).
+        self.ocr_job_id += 1
+        self.ocr_in_progress = True
+        self.current_capture_digest = None
         self.update_status("Processing OCR...")
-        preproc_img = preprocess_image(image_object)
-        ocr_text = perform_ocr_for_region(preproc_img) if is_region_capture else perform_ocr_single_line(preproc_img)
-        struct_list = []
-
-        if ocr_text:
-            list_raw_parts = parse_raw_ocr_to_list_of_parts(ocr_text)
-            if list_raw_parts:
-                self.update_status(f"OCR done, {len(list_raw_parts)}L. Structuring...")
-                for parts in list_raw_parts:
-                    item = structure_listing_data(parts)
-                    if item:
-                        struct_list.append(item)
-                self.update_preview_display(struct_list if struct_list else None)
-                if struct_list:
-                    self.update_status(f"{len(struct_list)} list(s) loaded. Save?")
-                else:
-                    self.update_status("Structure fail. Check OCR/selection.", error=True)
-            else:
-                self.update_status("No parts from OCR.", error=True)
-                self.update_preview_display(None)
+        self.preview_grid.set_rows(None)
+        threading.Thread(
+            target=self._threaded_ocr_operation,
+            args=(self.ocr_job_id, image_object, is_region_capture, self.archive_captures_var.get()),
+            daemon=True
+        ).start()
+
+    def _threaded_ocr_operation(self, job_id, image_object, is_region_capture, archive_capture):
+        capture_digest = self.capture_archive.store(image_object, is_region_capture) if archive_capture else None
+        struct_list, error_msg = ocr_image_to_listings(
+            image_object, is_region_capture, self.item_catalog,
+            status_callback=lambda msg: self.root.after(0, self._run_if_current_ocr_job, job_id, self.update_status, msg),
+            row_callback=lambda row: self.root.after(0, self._run_if_current_ocr_job, job_id, self.preview_grid.append_rows, [list(row)]))
+        self.root.after(0, self._finish_ocr_preview, job_id, struct_list, error_msg, capture_digest)
+
+    def _run_if_current_ocr_job(self, job_id, func, *args):
+        if job_id == self.ocr_job_id:
+            func(*args)
+
+    def _finish_ocr_preview(self, job_id, struct_list, error_msg, capture_digest):
+        if job_id != self.ocr_job_id:
+            return
+        self.ocr_in_progress = False
+        self.current_capture_digest = capture_digest
+        if struct_list:
+            # Rows were streamed in already; keep what the user did with them unless the final result differs
+            self.current_structured_preview_data = struct_list
+            if self.preview_grid.reconcile_rows(struct_list):
+                print("Preview: final OCR result differed from streamed rows; changed rows replaced.")
         else:
-            self.update_status("OCR no text.", error=True)
             self.update_preview_display(None)
+        self.refresh_preview_summary() # Save was held disabled while rows streamed in (ocr_in_progress)
+        if struct_list:
+            self.update_status(f"{len(struct_list)} list(s) loaded. Save?")
+        else:
+            self.update_status(error_msg, error=True)
+
+    def toggle_capture_archive(self):
+        save_app_settings(self.current_spreadsheet_id, self.current_worksheet_name, archive_captures=self.archive_captures_var.get())
+        self.update_status(f"Capture archive {'ON' if self.archive_captures_var.get() else 'OFF'}.")
+
+    def import_item_catalog(self):
+        path = filedialog.askopenfilename(
+            title="Import Item Names",
+            filetypes=[("Item lists", "*.txt *.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        added = self.item_catalog.import_list(path)
+        self.update_status(f"Catalog: +{added} item(s), {len(self.item_catalog.names)} total.")
+
+    def learn_item_names(self, names):
+        added = [n for n in names if self.item_catalog.add(n, persist=False)]
+        if added:
+            self.item_catalog.save()
+            print(f"Item catalog: learned {len(added)} new name(s).")
 
     def preview_listing_from_clipboard(self):
         self.update_status("Preview from clipboard...")
@@ -833,7 +2334,7 @@ class GTLHelperApp:
         self.update_status("Select region...")
         self.root.iconify()
         try:
-            RegionSelector(self.root, self.handle_captured_image)
+            RegionSelector(self.root, self.handle_captured_image, self.remember_capture_region)
         except Exception as e:
             print(f"Error creating RegionSelector: {e}")
             # De-iconify and show error if RegionSelector fails
@@ -844,6 +2345,40 @@ class GTLHelperApp:
             self.update_preview_display(None)
 
 
+    def remember_capture_region(self, bbox):
+        self.remembered_region = list(bbox)
+        save_app_settings(self.current_spreadsheet_id, self.current_worksheet_name, remembered_region=self.remembered_region)
+
+    def start_quick_capture_hotkey(self):
+        hotkey = self.app_settings.get("quick_capture_hotkey")
+        if not hotkey:
+            return
+        if pynput_keyboard is None:
+            print("pynput not installed; quick-capture hotkey disabled.")
+            return
+        try:
+            # Listener runs on its own thread; hand the capture to the Tk thread
+            self.hotkey_listener = pynput_keyboard.GlobalHotKeys(
+                {hotkey: lambda: self.root.after(0, self.quick_capture_remembered_region)})
+            self.hotkey_listener.daemon = True
+            self.hotkey_listener.start()
+            print(f"Quick-capture hotkey registered: {hotkey}")
+        except Exception as e:
+            print(f"Hotkey registration error ({hotkey}): {e}")
+            self.hotkey_listener = None
+
+    def quick_capture_remembered_region(self):
+        """Grabs the remembered region immediately: no overlay, no iconify/deiconify."""
+        if not self.remembered_region:
+            self.update_status("No remembered region. Use Capture once first.", error=True)
+            return
+        try:
+            img = ImageGrab.grab(bbox=tuple(self.remembered_region), all_screens=True)
+        except Exception as e:
+            self.update_status(f"Quick capture error: {e}", error=True)
+            return
+        self._process_image_for_preview(img, is_region_capture=True)
+
     def handle_captured_image(self, captured_image):
         self.root.deiconify()
         self.root.attributes('-topmost', True) # Bring app to front
@@ -863,7 +2398,7 @@ class GTLHelperApp:
             messagebox.showwarning("Save", "No data available to save.")
             return
 
-        data_to_save_list = list(self.current_structured_preview_data)
+        data_to_save_list = self.preview_grid.get_included_rows() # Includes inline edits, skips excluded rows
         if not data_to_save_list:
             self.update_status("No valid listings to save.", error=True)
             return
@@ -873,26 +2408,36 @@ class GTLHelperApp:
             print(item)
         print("------\n")
 
-        if hasattr(self, 'save_btn') and self.save_btn and self.save_btn.winfo_exists():
-            self.save_btn.configure(state="disabled")
+        self.save_in_progress = True
+        self.set_save_buttons_state("disabled")
 
-        self.preview_text_var.set("Saving..." if self.layout_is_mini else "Saving... Please wait.")
+        self.preview_text_var.set("Saving...")
         
         threading.Thread(
             target=self._threaded_save_operation,
-            args=(data_to_save_list, self.save_to_sheets_var.get(), self.save_to_csv_var.get()),
+            args=(data_to_save_list, self.save_to_sheets_var.get(), self.save_to_csv_var.get(), self.current_capture_digest,
+                  self.ocr_job_id),
             daemon=True
         ).start()
 
-    def _threaded_save_operation(self, data_list, save_sheets, save_csv):
+    def _threaded_save_operation(self, data_list, save_sheets, save_csv, capture_digest=None, saved_ocr_job_id=None):
         num = len(data_list)
         sheet_ok_c, csv_ok_c = 0, 0
         final_msg, final_err = "Save complete.", False
 
         if save_sheets:
             if self.worksheet and self.gspread_client: 
-                if append_to_google_sheet_batch(self.worksheet, data_list):
+                if self.worksheet_routing:
+                    shards = route_rows_to_shards(data_list, self.worksheet_routing, self.current_worksheet_name, self.item_categories)
+                    if append_to_sharded_sheets(self.worksheet.spreadsheet, shards, self.shard_sheet_ids, self.shard_sheet_ids_lock,
+                                                self.sheets_write_attempts):
+                        sheet_ok_c = num
+                        print(f"Routed {num} row(s) to {len(shards)} worksheet(s): {', '.join(shards)}")
+                    else:
+                        self.root.after(0, self.update_status, "Sheets save FAILED (routed batch).", True)
+                elif append_to_google_sheet_batch(self.worksheet, data_list, self.sheets_write_attempts):
                     sheet_ok_c = num
+                    self.sync_sheet_mirror_async()
                 else: 
                     self.root.after(0, self.update_status, "Sheets save FAILED (batch).", True)
             elif not self.gspread_client:
@@ -915,6 +2460,10 @@ class GTLHelperApp:
             else:
                 self.root.after(0, self.update_status, "CSV save FAILED.", True)
 
+        if sheet_ok_c or csv_ok_c:
+            self.root.after(0, self.learn_item_names, [item[0] for item in data_list])
+            self.capture_archive.link_rows(capture_digest, data_list)
+
         if save_sheets and save_csv:
             if sheet_ok_c == num and csv_ok_c == num:
                 final_msg = f"Saved {num} to Sheets & CSV."
@@ -937,11 +2486,308 @@ class GTLHelperApp:
             final_msg = "No save destination enabled."
             # Not necessarily an error, so final_err remains False unless other issues.
 
-        self.root.after(0, self.update_status, final_msg, final_err)
-        self.root.after(0, self.update_preview_display, None) 
+        self.root.after(0, self._finish_save, final_msg, final_err, saved_ocr_job_id)
+
+    def _finish_save(self, final_msg, final_err, saved_ocr_job_id=None):
+        self.save_in_progress = False # Only cleared here, so a capture finishing mid-save can't re-enable Save
+        self.update_status(final_msg, final_err)
+        if saved_ocr_job_id is None or saved_ocr_job_id == self.ocr_job_id:
+            self.update_preview_display(None) # Clear the rows that were just saved
+        else:
+            self.refresh_preview_summary() # A newer capture replaced them during the save; keep it and its edits
+
+
+# --- Fake Google Sheets Backend and Offline Save Benchmark (--bench-save) ---
+class _FakeApiResponse:
+    """Just enough of a requests.Response for gspread.exceptions.APIError and load_worksheet's error handling."""
+    def __init__(self, code, status, message):
+        self.status_code = code
+        self.text = message
+        self._error = {"error": {"code": code, "status": status, "message": message}}
+
+    def json(self):
+        return self._error
+
+class FakeSheetsBackend:
+    """Shared state and fault injection for the fake gspread objects. Every API call sleeps for a
+    simulated round trip, then may fail with 429 (never applied) or 503 (sometimes applied anyway)."""
+    def __init__(self, latency_s=BENCH_DEFAULT_LATENCY_MS / 1000, quota_error_rate=0.0, server_error_rate=0.0,
+                 commit_before_error_rate=BENCH_COMMIT_BEFORE_ERROR_RATE, seed=0):
+        self.latency_s = latency_s
+        self.quota_error_rate = quota_error_rate
+        self.server_error_rate = server_error_rate
+        self.commit_before_error_rate = commit_before_error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.spreadsheets = {}
+        self.stats = {"calls": 0, "quota_errors": 0, "server_errors": 0, "committed_errors": 0}
+
+    def request(self, commit):
+        """Runs commit() as one API call with simulated latency and faults."""
+        with self.lock:
+            self.stats["calls"] += 1
+            latency_s = max(0.0, self.rng.gauss(self.latency_s, self.latency_s / 4))
+            roll = self.rng.random()
+            commit_anyway = self.rng.random() < self.commit_before_error_rate
+        time.sleep(latency_s)
+        if roll < self.quota_error_rate:
+            with self.lock:
+                self.stats["quota_errors"] += 1
+            raise gspread.exceptions.APIError(_FakeApiResponse(429, "RESOURCE_EXHAUSTED", "Quota exceeded (fake)"))
+        if roll < self.quota_error_rate + self.server_error_rate:
+            with self.lock:
+                self.stats["server_errors"] += 1
+                if commit_anyway:
+                    self.stats["committed_errors"] += 1
+                    commit()
+            raise gspread.exceptions.APIError(_FakeApiResponse(503, "UNAVAILABLE", "Backend error (fake)"))
+        with self.lock:
+            return commit()
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.values = []
+
+    def append_rows(self, values, value_input_option='RAW'):
+        self.spreadsheet.backend.request(lambda: self.values.extend([list(r) for r in values]))
+
+    def get(self, range_name=None):
+        """Supports the 'A<first>:C<last>' / 'A<first>:C' ranges used by SheetMirror."""
+        first, last = range_name.split(':')
+        first_row, last_row = int(first[1:]), int(last[1:]) if last[1:] else None
+        return self.spreadsheet.backend.request(lambda: [list(r) for r in self.values[first_row - 1:last_row]])
+
+class FakeSpreadsheet:
+    def __init__(self, backend, spreadsheet_id):
+        self.backend = backend
+        self.id = spreadsheet_id
+        self._worksheets = [FakeWorksheet(self, "Sheet1", 0)]
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def fetch_sheet_metadata(self, params=None):
+        return self.backend.request(lambda: {"sheets": [{"properties": {"title": ws.title, "sheetId": ws.id}} for ws in self._worksheets]})
+
+    def batch_update(self, body):
+        """Applies addSheet and appendCells requests atomically, like spreadsheets.batchUpdate."""
+        def commit():
+            staged = {ws.id: ws for ws in self._worksheets}
+            added, appends = [], []
+            for request in body["requests"]:
+                if "addSheet" in request:
+                    props = request["addSheet"]["properties"]
+                    if props["sheetId"] in staged or any(ws.title == props["title"] for ws in staged.values()):
+                        raise gspread.exceptions.APIError(_FakeApiResponse(400, "INVALID_ARGUMENT", f"Sheet '{props['title']}' already exists (fake)"))
+                    staged[props["sheetId"]] = FakeWorksheet(self, props["title"], props["sheetId"])
+                    added.append(staged[props["sheetId"]])
+                elif "appendCells" in request:
+                    target = staged.get(request["appendCells"]["sheetId"])
+                    if target is None:
+                        raise gspread.exceptions.APIError(_FakeApiResponse(400, "INVALID_ARGUMENT", "No such sheetId (fake)"))
+                    appends.append((target, [[next(iter(cell["userEnteredValue"].values())) for cell in row["values"]]
+                                             for row in request["appendCells"]["rows"]]))
+            self._worksheets.extend(added)
+            for target, rows in appends:
+                target.values.extend(rows)
+            return {"replies": [{} for _ in body["requests"]]}
+        return self.backend.request(commit)
+
+class FakeGspreadClient:
+    """In-process stand-in for gspread.Client: open_by_key() returns (and remembers) a FakeSpreadsheet."""
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_by_key(self, key):
+        def commit():
+            return self.backend.spreadsheets.setdefault(key, FakeSpreadsheet(self.backend, key))
+        return self.backend.request(commit)
+
+class _HeadlessRoot:
+    """Replaces the Tk root: root.after() runs callbacks bound to the app and drops the rest (message boxes)."""
+    def __init__(self, app):
+        self.app = app
+
+    def after(self, delay_ms, fn=None, *args):
+        if fn is not None and getattr(fn, "__self__", None) is self.app:
+            fn(*args)
+
+class HeadlessSaveApp(GTLHelperApp):
+    """GTLHelperApp without any Tk widgets, so the real load_worksheet and _threaded_save_operation
+    can run against a fake client. Status messages are recorded instead of drawn."""
+    def __init__(self, gspread_client, spreadsheet_id, worksheet_name="Sheet1", worksheet_routing=None,
+                 sheets_write_attempts=SHEETS_WRITE_ATTEMPTS):
+        self.root = _HeadlessRoot(self)
+        self.gspread_client = gspread_client
+        self.worksheet = None
+        self.current_spreadsheet_id = spreadsheet_id
+        self.current_worksheet_name = worksheet_name
+        self.sheet_mirror = None
+        self.worksheet_routing = worksheet_routing
+        self.item_categories = {}
+        self.shard_sheet_ids = {}
+        self.shard_sheet_ids_lock = threading.Lock()
+        self.sheets_write_attempts = sheets_write_attempts
+        self.capture_archive = CaptureArchive()
+        self.status_lock = threading.Lock()
+        self.status_log = [] # (message, error)
+
+    def update_status(self, message, error=False):
+        with self.status_lock:
+            self.status_log.append((message, error))
 
+    def update_preview_display(self, list_of_structured_data):
+        pass
+
+    def learn_item_names(self, names):
+        pass # Synthetic names must not end up in the real item catalog
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_save_benchmark(saves=BENCH_DEFAULT_SAVES, rows_per_save=BENCH_DEFAULT_ROWS_PER_SAVE, concurrency=4,
+                       latency_ms=BENCH_DEFAULT_LATENCY_MS, quota_error_rate=BENCH_DEFAULT_QUOTA_ERROR_RATE,
+                       server_error_rate=BENCH_DEFAULT_SERVER_ERROR_RATE, worksheet_routing=None,
+                       sheets_write_attempts=SHEETS_WRITE_ATTEMPTS, seed=0):
+    """Drives synthetic saves through the real save path against FakeGspreadClient and reports throughput,
+    save latency percentiles, and rows lost or duplicated (checked against what the fake sheet holds)."""
+    backend = FakeSheetsBackend(latency_ms / 1000, quota_error_rate, server_error_rate, seed=seed)
+    app = HeadlessSaveApp(FakeGspreadClient(backend), "bench-spreadsheet", worksheet_routing=worksheet_routing,
+                          sheets_write_attempts=sheets_write_attempts)
+    backend.quota_error_rate = backend.server_error_rate = 0.0 # Setup is not part of the measurement
+    if not app.load_worksheet():
+        print(f"Benchmark: load_worksheet failed: {app.status_log[-1:]}")
+        return None
+    backend.quota_error_rate, backend.server_error_rate = quota_error_rate, server_error_rate
+
+    rng = random.Random(seed)
+    batches = [[[f"Bench Item {i:06d}-{j}", float(rng.randint(100, 10 ** 6)),
+                 datetime(2025, rng.randint(1, 12), rng.randint(1, 28)).strftime('%d/%m/%Y')]
+                for j in range(rows_per_save)] for i in range(saves)]
+
+    def timed_save(batch):
+        start = time.perf_counter()
+        app._threaded_save_operation(batch, True, False)
+        return time.perf_counter() - start
+
+    print(f"Benchmark: {saves} saves x {rows_per_save} rows, {concurrency} concurrent, {latency_ms}ms latency, "
+          f"{quota_error_rate:.1%} quota / {server_error_rate:.1%} server errors, routing={worksheet_routing or 'off'}, "
+          f"{sheets_write_attempts} write attempt(s)...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(timed_save, batches))
+    elapsed = time.perf_counter() - started
+
+    stored = {}
+    for ws in backend.spreadsheets["bench-spreadsheet"].worksheets():
+        for row in ws.values:
+            stored[row[0]] = stored.get(row[0], 0) + 1
+    expected = [row[0] for batch in batches for row in batch]
+    results = {
+        "saves_per_s": saves / elapsed,
+        "rows_per_s": len(expected) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "failed_saves": sum(1 for message, error in app.status_log if error and message.startswith("Sheets: Failed")),
+        "lost_rows": sum(1 for name in expected if name not in stored),
+        "duplicated_rows": sum(count - 1 for count in stored.values() if count > 1),
+        "api_calls": backend.stats["calls"],
+        "quota_errors": backend.stats["quota_errors"],
+        "server_errors": backend.stats["server_errors"],
+    }
+    print(f"Benchmark: {results['saves_per_s']:.1f} saves/s ({results['rows_per_s']:.0f} rows/s) in {elapsed:.1f}s; "
+          f"latency p50 {results['p50_ms']:.0f}ms, p95 {results['p95_ms']:.0f}ms, p99 {results['p99_ms']:.0f}ms, "
+          f"max {results['max_ms']:.0f}ms.")
+    print(f"Benchmark: {results['failed_saves']} failed save(s), {results['lost_rows']} lost row(s), "
+          f"{results['duplicated_rows']} duplicated row(s); {results['api_calls']} API calls, "
+          f"{results['quota_errors']} quota and {results['server_errors']} server error(s) injected.")
+    return results
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Pokemmo GTL OCR Helper")
+    parser.add_argument("--reocr-archive", action="store_true",
+                        help=f"Re-run OCR over archived captures and write differences to {ARCHIVE_CORRECTIONS_CSV}.")
+    parser.add_argument("--tune", action="store_true",
+                        help=f"Sweep OCR settings over a labelled set and save the best profile to {APP_SETTINGS_FILE}.")
+    parser.add_argument("--labels", metavar="DIR",
+                        help="Labelled set for --tune (DIR/labels.json). Defaults to archived captures with saved rows.")
+    parser.add_argument("--train-model", action="store_true",
+                        help=f"Fine-tune a compact '{TRAIN_MODEL_NAME}' Tesseract model on synthetic rows in the game font (needs --font).")
+    parser.add_argument("--font", metavar="TTF", help="Game font file used to render training lines for --train-model.")
+    parser.add_argument("--base-traineddata", metavar="PATH",
+                        help=f"Float {TRAIN_BASE_LANG}.traineddata to fine-tune from (default: found via Tesseract).")
+    parser.add_argument("--lines", type=int, default=TRAIN_DEFAULT_LINES, help=f"Synthetic lines for --train-model (default: {TRAIN_DEFAULT_LINES}).")
+    parser.add_argument("--iterations", type=int, default=TRAIN_DEFAULT_ITERATIONS,
+                        help=f"Training iterations for --train-model (default: {TRAIN_DEFAULT_ITERATIONS}).")
+    parser.add_argument("--bench-save", action="store_true",
+                        help="Benchmark the save path against an in-process fake Google Sheets backend (uses --workers as concurrency).")
+    parser.add_argument("--saves", type=int, default=BENCH_DEFAULT_SAVES, help=f"Saves for --bench-save (default: {BENCH_DEFAULT_SAVES}).")
+    parser.add_argument("--rows-per-save", type=int, default=BENCH_DEFAULT_ROWS_PER_SAVE,
+                        help=f"Rows per save for --bench-save (default: {BENCH_DEFAULT_ROWS_PER_SAVE}).")
+    parser.add_argument("--latency-ms", type=float, default=BENCH_DEFAULT_LATENCY_MS,
+                        help=f"Simulated API latency for --bench-save (default: {BENCH_DEFAULT_LATENCY_MS}).")
+    parser.add_argument("--quota-error-rate", type=float, default=BENCH_DEFAULT_QUOTA_ERROR_RATE,
+                        help=f"Share of fake API calls failing with 429 (default: {BENCH_DEFAULT_QUOTA_ERROR_RATE}).")
+    parser.add_argument("--server-error-rate", type=float, default=BENCH_DEFAULT_SERVER_ERROR_RATE,
+                        help=f"Share of fake API calls failing with 503 (default: {BENCH_DEFAULT_SERVER_ERROR_RATE}).")
+    parser.add_argument("--routing", choices=WORKSHEET_ROUTING_MODES, help="Worksheet routing mode for --bench-save.")
+    parser.add_argument("--sheets-attempts", type=int, default=SHEETS_WRITE_ATTEMPTS,
+                        help=f"Tries per Sheets write for --bench-save, like the sheets_write_attempts setting (default: {SHEETS_WRITE_ATTEMPTS}).")
+    parser.add_argument("--serve", action="store_true",
+                        help=f"Run only the local OCR server (http://{OCR_SERVER_HOST}:PORT/ocr), without the GUI.")
+    parser.add_argument("--port", type=int, default=OCR_SERVER_DEFAULT_PORT, help=f"OCR server port (default: {OCR_SERVER_DEFAULT_PORT}).")
+    parser.add_argument("--workers", type=int, default=4, help="Worker count for bulk jobs (default: 4).")
+    parser.add_argument("--processes", action="store_true",
+                        help="With --serve, run OCR in worker processes fed through shared memory instead of threads.")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    cli_args = parse_cli_args()
+    startup_settings = load_app_settings()
+    apply_ocr_profile(startup_settings.get("ocr_profile"))
+    apply_ocr_model(startup_settings.get("ocr_model"), startup_settings.get("tessdata_dir"))
+    if cli_args.train_model:
+        if not cli_args.font:
+            print("--train-model needs --font PATH to the game's font file.")
+        else:
+            train_game_font_model(cli_args.font, cli_args.base_traineddata, cli_args.lines, cli_args.iterations)
+        exit()
+    if cli_args.bench_save:
+        run_save_benchmark(cli_args.saves, cli_args.rows_per_save, cli_args.workers, cli_args.latency_ms,
+                           cli_args.quota_error_rate, cli_args.server_error_rate, cli_args.routing, cli_args.sheets_attempts)
+        exit()
+    if cli_args.tune:
+        run_ocr_tuning(cli_args.labels, max_workers=cli_args.workers)
+        exit()
+    if cli_args.reocr_archive:
+        reocr_capture_archive(CaptureArchive(), ItemCatalog(), max_workers=cli_args.workers)
+        exit()
+    if cli_args.serve:
+        server = start_ocr_server(
+            OcrService(ItemCatalog(), max_workers=cli_args.workers, process_workers=cli_args.workers if cli_args.processes else 0),
+            cli_args.port)
+        if server:
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                server.shutdown()
+        exit()
+
     if not os.path.exists(CLIENT_SECRETS_FILE):
         messagebox.showerror("Setup Error", f"Desktop OAuth Client Secrets file ('{CLIENT_SECRETS_FILE}') not found. Please ensure it is in the same directory as the application.")
         exit()